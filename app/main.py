@@ -1,3 +1,4 @@
+import asyncio
 import time
 from typing import AsyncGenerator, Optional, Annotated
 
@@ -9,7 +10,7 @@ from fastapi.staticfiles import StaticFiles
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.middleware.cors import CORSMiddleware
 from loguru import logger
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 import logging
 
 from app.functions.main_func import parse_int_list, auth_user, handle_partial_request, build_full_page_context
@@ -17,6 +18,9 @@ from app.routers import category, products, auth, reviews, favorites, cart, orde
 from app.routers.auth import auto_refresh_token
 from database.db_depends import get_db
 from database.db import Base, engine
+from general_functions.agents_func import agent_roster_watcher
+from general_functions.broker import broker
+from general_functions.idempotency_func import idempotency_keys_sweeper
 from app.log.log import LOGGER
 from config import Config
 
@@ -28,8 +32,18 @@ logger.setLevel(logging.INFO)
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+
+    await broker.start()
+    sweeper = asyncio.create_task(idempotency_keys_sweeper())
+    roster_watcher = asyncio.create_task(agent_roster_watcher())
     yield
 
+    for task in (sweeper, roster_watcher):
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await broker.stop()
+
 
 class NoCacheStaticFiles(StaticFiles):
     def __init__(self, *args, **kwargs):
@@ -1,5 +1,4 @@
 from typing import Optional
-from random import choice
 
 from fastapi import APIRouter, Depends, status, HTTPException, Cookie, Request
 from fastapi.templating import Jinja2Templates
@@ -7,12 +6,15 @@ from fastapi.responses import HTMLResponse, RedirectResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from general_functions.auth_func import checking_access_rights
-from database.crud.chats import update_chat_status, create_chat, get_chat
+from database.crud.archive import get_archived_chats
+from database.crud.chats import update_chat_status, create_chat, get_chat, mark_chat_read, get_unread_counts
 from database.crud.decorators import handler_base_errors
+from general_functions.agents_func import agent_roster
 from database.crud.users import get_user
 from database.db_depends import get_db
-from database.crud.messages import get_message
+from database.crud.messages import get_messages_page
 from schemas import ChatCreate
+from models import ChatsArchive
 from config import Config
 
 router = APIRouter(prefix='/chats', tags=['chats'])
@@ -21,24 +23,21 @@ templates = Jinja2Templates(directory='app/templates/')
 
 @router.get('/my')
 @handler_base_errors
-async def get_all_chats(db: AsyncSession = Depends(get_db),
+async def get_all_chats(archived: bool = False,
+                        db: AsyncSession = Depends(get_db),
                         token: Optional[str] = Cookie(None, alias='token')
 ):
     try:
         user_id = await checking_access_rights(token=token, roles=['customer', 'seller'])
 
-        chats = await get_chat(user_id=user_id, sort_desc=True, db=db)
+        if archived:
+            chats = await get_archived_chats(user_id=user_id, sort_desc=True, db=db)
+        else:
+            chats = await get_chat(user_id=user_id, sort_desc=True, with_last_message=True, db=db)
         if not chats:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                                 detail='Чаты не найдены')
 
-        for chat in chats:
-            last_msg = await get_message(chat_id=chat.id,
-                                         sort_desc=True,
-                                         db=db)
-
-            chat.last_message = last_msg
-
         return chats
     except HTTPException as e:
         if e.status_code == 401:
@@ -49,6 +48,7 @@ async def get_all_chats(db: AsyncSession = Depends(get_db),
 @router.get('/load-more', response_class=HTMLResponse)
 async def get_chats_partial(request: Request,
                             page: int = 1,
+                            archived: bool = False,
                             token: Optional[str] = Cookie(None, alias='token'),
                             db: AsyncSession = Depends(get_db)
 ):
@@ -58,20 +58,18 @@ async def get_chats_partial(request: Request,
         limit = 10
         offset = (page - 1) * limit
 
-        chats_with_extra = await get_chat(user_id=user_id, sort_desc=True, offset=offset, limit=(limit + 1), db=db)
+        if archived:
+            chats_with_extra = await get_archived_chats(user_id=user_id, offset=offset, limit=(limit + 1), db=db)
+        else:
+            chats_with_extra = await get_chat(user_id=user_id, sort_desc=True, offset=offset, limit=(limit + 1),
+                                              with_last_message=True, db=db)
         has_more = len(chats_with_extra) > limit
         chats = chats_with_extra[:limit]
 
-        for chat in chats:
-            last_msg = await get_message(chat_id=chat.id,
-                                         sort_desc=True,
-                                         limit=1,
-                                         db=db)
-            chat.last_message = last_msg
-
         return templates.TemplateResponse("profile/chat_items.html", {
             "request": request,
             "chats": chats,
+            "archived": archived,
             "has_more": has_more,
             "next_page": page + 1 if has_more else None
         })
@@ -84,6 +82,23 @@ async def get_chats_partial(request: Request,
         print(f"Ошибка при подгрузке чатов: {e}")
 
 
+@router.get('/unread')
+@handler_base_errors
+async def get_unread(db: AsyncSession = Depends(get_db),
+                     token: Optional[str] = Cookie(None, alias='token')
+):
+    try:
+        user_id = await checking_access_rights(token=token, roles=['customer', 'seller'])
+
+        unread = await get_unread_counts(user_id=user_id, db=db)
+        return {"total": sum(unread.values()), "chats": unread}
+
+    except HTTPException as e:
+        if e.status_code == 401:
+            return RedirectResponse(url="/auth/create", status_code=303)
+        raise
+
+
 @router.get('/{chat_id}')
 @handler_base_errors
 async def chat_by_id(chat_id: int,
@@ -115,11 +130,14 @@ async def chat_create(chat_data: ChatCreate,
     try:
         user_id = await checking_access_rights(token=token, roles=['customer', 'seller'])
 
-        employee_ids = await get_user(db=db, role='seller')
+        candidate_ids = await agent_roster.candidates(db=db)
+        if not candidate_ids:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail='Нет доступных операторов')
 
         await create_chat(user_id=user_id,
-                          employee_id=choice(employee_ids).id,
                           topic=chat_data.topic,
+                          candidate_ids=candidate_ids,
                           db=db)
 
         return {"message": f"Создан новый чат на тему: '{chat_data.topic}'"}
@@ -147,6 +165,33 @@ async def chats_close(chat_id: int,
         raise
 
 
+@router.post('/{chat_id}/read')
+@handler_base_errors
+async def chat_read(chat_id: int,
+                    message_id: Optional[int] = None,
+                    db: AsyncSession = Depends(get_db),
+                    token: Optional[str] = Cookie(None, alias='token')
+):
+    try:
+        user_id = await checking_access_rights(token=token, roles=['customer', 'seller'])
+
+        chat = await get_chat(chat_id=chat_id, db=db)
+        if not chat:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                detail='Чат не найден')
+        if chat.user_id != user_id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                                detail='Нет прав для доступа')
+
+        unread = await mark_chat_read(chat_id=chat_id, message_id=message_id, db=db)
+        return {"chat_id": chat_id, "unread": unread}
+
+    except HTTPException as e:
+        if e.status_code == 401:
+            return RedirectResponse(url="/auth/create", status_code=303)
+        raise
+
+
 @router.get('/{chat_id}/view', response_class=HTMLResponse)
 async def view_chat(request: Request,
                     chat_id: int,
@@ -156,25 +201,34 @@ async def view_chat(request: Request,
     try:
         user_id = await checking_access_rights(token=token, roles=['customer', 'seller'])
 
-        chat = await get_chat(chat_id=chat_id, db=db)
+        chat = await get_chat(chat_id=chat_id, include_archived=True, db=db)
         if not chat:
             return templates.TemplateResponse(
                 "exceptions/not_found.html",
                 {"request": request}
             )
+        if chat.user_id != user_id:
+            # история, в том числе архивная, отдается только владельцу чата
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                                detail='Нет прав для доступа')
 
         employee = await get_user(db=db, user_id=chat.employee_id)
 
-        messages = await get_message(chat_id=chat_id,
-                                     sort_asc=True,
-                                     db=db)
+        archived = isinstance(chat, ChatsArchive)
+        rows, older_cursor = await get_messages_page(db=db, chat_id=chat_id, limit=Config.chat_window_size,
+                                                     archived=archived)
+        messages = [message for message, _ in reversed(rows)]
 
         current_user = await get_user(db=db, user_id=user_id)
 
+        if not archived:
+            await mark_chat_read(chat_id=chat_id, db=db)
+
         return templates.TemplateResponse('chat/chat_detail.html', {
             'request': request,
             'chat': chat,
             'messages': messages,
+            'older_cursor': older_cursor,
             'user': current_user,
             'employee': employee,
             'is_authenticated': True,
@@ -1,17 +1,17 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends, status, HTTPException, Query, Cookie
+from fastapi import APIRouter, Depends, status, HTTPException, Query, Cookie, WebSocket
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 from starlette.responses import RedirectResponse
 
 from database.crud.chats import get_chat
 from database.crud.decorators import handler_base_errors
 from database.db_depends import get_db
-from database.crud.messages import create_message
+from database.crud.messages import create_message, get_messages_page
 from models import *
 from general_functions.auth_func import checking_access_rights
+from general_functions.chat_func import run_chat_socket
 from schemas import MessageCreate
 
 router = APIRouter(prefix='/messages', tags=['messages'])
@@ -21,36 +21,23 @@ templates = Jinja2Templates(directory='app_support/templates/')
 @router.get('/by_chat/{chat_id}')
 @handler_base_errors
 async def messages_by_chat_id(chat_id: int,
-                              page: int = Query(1, ge=1),
+                              before: Optional[str] = Query(None, description="Курсор самого старого загруженного сообщения"),
                               limit: int = Query(15, ge=1, le=50),
                               db: AsyncSession = Depends(get_db),
                               token: Optional[str] = Cookie(default=None, alias="token")
 ):
     try:
         user_id = await checking_access_rights(token=token, roles=['customer'])
-        chat = await get_chat(db=db, chat_id=chat_id)
+        chat = await get_chat(db=db, chat_id=chat_id, include_archived=True)
         if user_id != chat.user_id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
                                 detail='Нет прав для доступа')
 
-        offset = (page - 1) * limit
-
-        query = (
-            select(Messages, User.username.label("sender_name"))
-            .join(User, Messages.sender_id == User.id)
-            .where(Messages.chat_id == chat_id)
-            .order_by(Messages.created_at.desc())
-            .offset(offset)
-            .limit(limit)
-        )
-
-        result = await db.execute(query)
-        rows = result.all()
+        rows, next_cursor = await get_messages_page(db=db, chat_id=chat_id, before=before, limit=limit,
+                                                    archived=isinstance(chat, ChatsArchive))
 
         messages = []
-        for row in rows:
-            msg = row[0]
-            sender_name = row[1]
+        for msg, sender_name in rows:
             msg_dict = {
                 "id": msg.id,
                 "chat_id": msg.chat_id,
@@ -60,7 +47,11 @@ async def messages_by_chat_id(chat_id: int,
                 "created_at": msg.created_at.isoformat() if msg.created_at else None
             }
             messages.append(msg_dict)
-        return messages
+        return {
+            "messages": messages,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None
+        }
 
     except HTTPException as e:
         if e.status_code == 401:
@@ -96,3 +87,24 @@ async def messages_create(message_data: MessageCreate,
         if e.status_code == 401:
             return RedirectResponse(url="/auth/create", status_code=303)
         raise
+
+
+@router.websocket('/ws/{chat_id}')
+async def messages_socket(websocket: WebSocket,
+                          chat_id: int,
+                          db: AsyncSession = Depends(get_db),
+                          token: Optional[str] = Cookie(None, alias='token')
+):
+    try:
+        user_id = await checking_access_rights(token=token, roles=['customer'])
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    chat = await get_chat(chat_id=chat_id, user_id=user_id, db=db)
+    if not chat:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await db.close()
+
+    await run_chat_socket(websocket, chat=chat, sender_id=user_id)
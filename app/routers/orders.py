@@ -1,21 +1,21 @@
 from typing import Optional
 
-import httpx
-from fastapi import APIRouter, Depends, status, HTTPException, Request, Cookie, Query
+from fastapi import APIRouter, Depends, status, HTTPException, Request, Cookie, Query, Header
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
-from starlette.responses import HTMLResponse, RedirectResponse
+from starlette.responses import HTMLResponse, RedirectResponse, JSONResponse, StreamingResponse
 
 from general_functions.auth_func import checking_access_rights
+from general_functions.broker import sse_stream, ORDER_EVENTS_CHANNEL
 from app.routers.cart import get_cart_by_user
 from database.crud.decorators import handler_base_errors
-from database.crud.orders import create_new_order, get_orders, update_status
-from database.crud.products import get_product
+from database.crud.idempotency import get_idempotency_key
+from database.crud.orders import get_orders
 from database.db_depends import get_db
 from config import Config
-from general_functions.orders_func import fetch_orders_for_user
-from general_functions.product_func import update_stock
+from general_functions.orders_func import (fetch_orders_for_user, place_order, build_order_lines, order_created_response,
+                                           cancel_order_with_restock, order_request_hash)
 from schemas import OrderResponse
 
 router = APIRouter(prefix="/orders", tags=["orders"])
@@ -24,8 +24,9 @@ templates = Jinja2Templates(directory="app/templates")
 
 @router.get('/user/{user_id}')
 async def get_orders_by_user_id(user_id: int,
-                                page: int = Query(1, ge=1),
+                                cursor: Optional[str] = Query(None),
                                 per_page: int = Query(5, ge=1, le=50),
+                                with_count: bool = Query(False),
                                 db: AsyncSession = Depends(get_db),
                                 token: Optional[str] = Cookie(None, alias='token')
 ):
@@ -35,7 +36,11 @@ async def get_orders_by_user_id(user_id: int,
         if user_id != user_id_from_token:
             raise HTTPException(status_code=403, detail='Недостаточно прав для просмотра заказов')
 
-        return await fetch_orders_for_user(user_id, page, per_page, db)
+        return await fetch_orders_for_user(user_id=user_id,
+                                           per_page=per_page,
+                                           cursor=cursor,
+                                           with_count=with_count,
+                                           db=db)
 
     except HTTPException as e:
         if e.status_code == 401:
@@ -43,6 +48,19 @@ async def get_orders_by_user_id(user_id: int,
         raise
 
 
+@router.get('/events')
+async def order_status_events(request: Request,
+                              token: Optional[str] = Cookie(None, alias='token')
+):
+    user_id = await checking_access_rights(token=token, roles=['customer'])
+
+    return StreamingResponse(
+        sse_stream(request, ORDER_EVENTS_CHANNEL, key=user_id),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 @router.get('/{order_id}', response_model=OrderResponse)
 async def get_order_by_id(order_id: int,
                           request: Request,
@@ -67,8 +85,26 @@ async def get_order_by_id(order_id: int,
         raise
 
 
+async def _stored_order_response(db: AsyncSession,
+                                key: str,
+                                user_id: int,
+                                request_hash: str = None
+):
+    stored = await get_idempotency_key(key=key, user_id=user_id, endpoint='orders.create', db=db)
+    if stored is None:
+        return None
+    # пустая корзина - обычный повтор после успешного заказа; другая непустая корзина - другой запрос
+    if request_hash and stored.request_hash and request_hash != stored.request_hash:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail='Ключ идемпотентности уже использован для другого заказа'
+        )
+    return JSONResponse(content=stored.response, status_code=stored.status_code)
+
+
 @router.post('/create', status_code=status.HTTP_201_CREATED)
 async def create_order(token: Optional[str] = Cookie(None, alias='token'),
+                       idempotency_key: Optional[str] = Header(None, alias='Idempotency-Key', max_length=255),
                        db: AsyncSession = Depends(get_db)):
     try:
         user_id = await checking_access_rights(token=token, roles=['customer'])
@@ -80,6 +116,15 @@ async def create_order(token: Optional[str] = Cookie(None, alias='token'),
             )
 
         order_products = await get_cart_by_user(token=token, db=db)
+        request_hash = order_request_hash(order_products) if order_products else None
+
+        if idempotency_key:
+            # корзина читается до проверки ключа: если запрос с этим ключом уже оформил заказ,
+            # она пуста и сохраненный ответ повторяется без сверки отпечатка
+            replay = await _stored_order_response(key=idempotency_key, user_id=user_id,
+                                                  request_hash=request_hash, db=db)
+            if replay:
+                return replay
 
         if not order_products:
             raise HTTPException(
@@ -87,35 +132,23 @@ async def create_order(token: Optional[str] = Cookie(None, alias='token'),
                 detail='Корзина пуста'
             )
 
-        products_data = {}
-        total_sum = 0
+        order = await place_order(user_id=user_id,
+                                  cart_items=order_products,
+                                  idempotency_key=idempotency_key,
+                                  endpoint='orders.create',
+                                  db=db)
 
-        for product in order_products:
-            await update_stock(product_id=product['product_id'], count=product['count'], db=db)
+        if order is None:
+            replay = await _stored_order_response(key=idempotency_key, user_id=user_id,
+                                                  request_hash=request_hash, db=db)
+            if replay is None:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail='Запрос с этим ключом идемпотентности еще выполняется'
+                )
+            return replay
 
-            products_data[product['product_id']] = {
-                'price': product['product']['price'],
-                'count': product['count']
-            }
-
-            total_sum += product['product']['price'] * product['count']
-
-        order = await create_new_order(user_id=user_id,
-                                       products=products_data,
-                                       summa=total_sum,
-                                       db=db)
-
-        async with httpx.AsyncClient() as client:
-            response = await client.delete(
-                f"{Config.url}/cart/clear",
-                cookies={'token': token}
-            )
-            response.raise_for_status()
-            await db.commit()
-
-        return {'message': 'Заказ оформлен!',
-                'order_id': order.id,
-                'redirect_url': f'/orders/{order.id}'}
+        return order_created_response(order)
 
     except HTTPException as e:
         if e.status_code == 401:
@@ -137,14 +170,9 @@ async def cancel_order(order_id: int,
                        db: AsyncSession = Depends(get_db)
 ):
     try:
-        await checking_access_rights(token=token, roles=['customer'])
-
-        await update_status(order_id=order_id, db=db, new_status='CANCELLED')
-
-        order = await get_orders(db=db, order_id=order_id)
+        user_id = await checking_access_rights(token=token, roles=['customer'])
 
-        for product_id, product_info in order.products.items():
-            await update_stock(product_id=int(product_id), count=product_info['count'], db=db, add=True)
+        await cancel_order_with_restock(order_id=order_id, user_id=user_id, db=db)
         return f'Заказ № {order_id} отменен'
 
     except HTTPException as e:
@@ -185,23 +213,7 @@ async def order_page(request: Request,
                 {"request": request}
             )
 
-        order_products = []
-        total_amount = 0
-
-        for product_id, product_data in order.products.items():
-            product = await get_product(db=db, product_id=int(product_id))
-
-            if product:
-                item_total = product_data['count'] * product_data['price']
-                order_products.append({
-                    'id': product.id,
-                    'name': product.name,
-                    'price': product_data['price'],
-                    'count': product_data['count'],
-                    'image_url': product.image_urls[0],
-                    'item_total': item_total
-                })
-                total_amount += item_total
+        order_products, total_amount = await build_order_lines(order=order, db=db)
 
         order.created_at = order.date.strftime("%Y-%m-%d %H:%M")
         order.total_sum = order.summa
@@ -208,15 +208,37 @@ function showLoginPrompt(message) {
     }
 }
 
+async function postOrderWithRetry(idempotencyKey, attempts = 3) {
+    for (let attempt = 1; ; attempt++) {
+        const controller = new AbortController();
+        const timeoutId = setTimeout(() => controller.abort(), 15000);
+        try {
+            return await fetch('/orders/create', {
+                method: 'POST',
+                credentials: 'include',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'Idempotency-Key': idempotencyKey,
+                },
+                signal: controller.signal,
+            });
+        } catch (error) {
+            // повтор с тем же ключом не создаст второй заказ
+            if (attempt >= attempts) throw error;
+            await new Promise(resolve => setTimeout(resolve, 500 * attempt));
+        } finally {
+            clearTimeout(timeoutId);
+        }
+    }
+}
+
 async function createOrder() {
     try {
-        const response = await fetch('/orders/create', {
-            method: 'POST',
-            credentials: 'include',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-        });
+        const idempotencyKey = (window.crypto && crypto.randomUUID)
+            ? crypto.randomUUID()
+            : `${Date.now()}-${Math.random().toString(16).slice(2)}`;
+
+        const response = await postOrderWithRetry(idempotencyKey);
 
         const data = await response.json();
 
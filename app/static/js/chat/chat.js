@@ -7,12 +7,20 @@ document.addEventListener('DOMContentLoaded', function () {
     const messageInput = document.getElementById('messageInput');
     const sendMessageBtn = document.getElementById('sendMessage');
     const chatMessages = document.getElementById('chatMessages');
+    const unreadBadge = document.getElementById('chatUnreadBadge');
+    const UNREAD_POLL_INTERVAL = 30000;
 
     let currentChatId = null;
     let isLoading = false;
     let hasMore = true;
-    let page = 1;
+    let beforeCursor = null;
     let isInitialized = false;
+    let socket = null;
+
+    if (unreadBadge) {
+        refreshUnreadBadge();
+        setInterval(refreshUnreadBadge, UNREAD_POLL_INTERVAL);
+    }
 
     chatButton?.addEventListener('click', async function () {
         chatModal.style.display = 'block';
@@ -45,6 +53,7 @@ document.addEventListener('DOMContentLoaded', function () {
                 chatModal.style.display = 'none';
                 currentChatId = null;
                 isInitialized = false;
+                disconnectSocket();
 
                 updateEndChatButtonVisibility();
 
@@ -93,6 +102,7 @@ document.addEventListener('DOMContentLoaded', function () {
 
                 chatId = activeChat.id;
                 currentChatId = chatId;
+                connectSocket(chatId);
                 updateEndChatButtonVisibility();
 
                 const prompt = document.getElementById('initialPrompt');
@@ -103,6 +113,12 @@ document.addEventListener('DOMContentLoaded', function () {
                 chatMessages.scrollTop = chatMessages.scrollHeight;
             }
 
+            if (await waitForSocket()) {
+                socket.send(JSON.stringify({ message: text }));
+                messageInput.value = '';
+                return;
+            }
+
             const response = await fetch('/messages/create', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
@@ -165,6 +181,7 @@ document.addEventListener('DOMContentLoaded', function () {
 
             if (activeChat) {
                 currentChatId = activeChat.id;
+                connectSocket(currentChatId);
                 setupInfiniteScroll();
                 await loadMessages(true);
             } else {
@@ -187,23 +204,26 @@ document.addEventListener('DOMContentLoaded', function () {
 
         isLoading = true;
         if (reset) {
-            page = 1;
+            beforeCursor = null;
             hasMore = true;
             chatMessages.innerHTML = '<div class="message-system">Загрузка...</div>';
         }
 
         try {
-            const url = `/messages/by_chat/${currentChatId}?page=${page}&limit=10`;
-            const response = await fetch(url);
-            const data = await response.json();
+            const params = new URLSearchParams({ limit: 10 });
+            if (beforeCursor) params.set('before', beforeCursor);
+            const response = await fetch(`/messages/by_chat/${currentChatId}?${params}`);
+            const payload = await response.json();
 
-            if (!response.ok) throw new Error(data.detail || 'Ошибка загрузки');
+            if (!response.ok) throw new Error(payload.detail || 'Ошибка загрузки');
+
+            const data = payload.messages;
 
             if (reset) {
                 chatMessages.innerHTML = '';
             }
 
-            if (data.length === 0 && page === 1) {
+            if (data.length === 0 && !beforeCursor) {
                 chatMessages.innerHTML = '<div class="message-system">Нет сообщений. Начните диалог!</div>';
                 hasMore = false;
                 isLoading = false;
@@ -227,11 +247,10 @@ document.addEventListener('DOMContentLoaded', function () {
                 chatMessages.insertBefore(fragment, chatMessages.firstChild);
             }
 
-            if (data.length < 10) {
-                hasMore = false;
-            } else {
-                page++;
-            }
+            hasMore = payload.has_more;
+            beforeCursor = payload.next_cursor;
+
+            if (reset) markChatRead();
 
         } catch (error) {
             if (reset) {
@@ -242,11 +261,100 @@ document.addEventListener('DOMContentLoaded', function () {
         }
     }
 
+    function connectSocket(chatId, isReconnect = false) {
+        disconnectSocket();
+        const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
+        const ws = new WebSocket(`${protocol}://${window.location.host}/messages/ws/${chatId}`);
+
+        ws.addEventListener('open', function () {
+            // за время разрыва сообщения могли потеряться - перечитываем историю
+            if (isReconnect) loadMessages(true);
+        });
+
+        ws.addEventListener('message', function (e) {
+            const data = JSON.parse(e.data);
+            if (data.event === 'resync') {
+                loadMessages(true);
+            } else if (data.event === 'message_created' && data.chat_id === currentChatId) {
+                if (chatMessages.querySelector(`[data-message-id="${data.id}"]`)) return;
+                chatMessages.querySelectorAll('.message-system').forEach(el => el.remove());
+                addMessageToChat(data);
+                chatMessages.scrollTop = chatMessages.scrollHeight;
+                markChatRead();
+            } else if (data.event === 'error') {
+                alert('Ошибка: ' + data.detail);
+            }
+        });
+
+        ws.addEventListener('close', function () {
+            // переподключаемся, пока чат открыт и сокет не закрыт намеренно
+            if (socket === ws && currentChatId === chatId) {
+                socket = null;
+                setTimeout(() => {
+                    if (currentChatId === chatId && !socket) connectSocket(chatId, true);
+                }, 2000);
+            }
+        });
+
+        socket = ws;
+    }
+
+    function setUnreadBadge(total) {
+        if (!unreadBadge) return;
+        unreadBadge.textContent = total;
+        unreadBadge.hidden = !total;
+    }
+
+    async function refreshUnreadBadge() {
+        if (document.hidden) return;
+        try {
+            const response = await fetch('/chats/unread', { headers: { 'Accept': 'application/json' } });
+            if (!response.ok) return;
+            const data = await response.json();
+            setUnreadBadge(data.total);
+        } catch (error) {
+            // счетчик необязателен, ждем следующего опроса
+        }
+    }
+
+    async function markChatRead() {
+        // сообщения прочитаны, только если окно чата открыто
+        if (!currentChatId || chatModal.style.display !== 'block' || document.hidden) return;
+        try {
+            const response = await fetch(`/chats/${currentChatId}/read`, { method: 'POST' });
+            if (response.ok) await refreshUnreadBadge();
+        } catch (error) {
+            // отметка повторится при следующем сообщении или открытии чата
+        }
+    }
+
+    function disconnectSocket() {
+        if (socket) {
+            const ws = socket;
+            socket = null;
+            ws.close();
+        }
+    }
+
+    function waitForSocket(timeout = 3000) {
+        if (!socket) return Promise.resolve(false);
+        if (socket.readyState === WebSocket.OPEN) return Promise.resolve(true);
+        if (socket.readyState !== WebSocket.CONNECTING) return Promise.resolve(false);
+
+        const ws = socket;
+        return new Promise(resolve => {
+            const timer = setTimeout(() => resolve(false), timeout);
+            ws.addEventListener('open', () => { clearTimeout(timer); resolve(true); }, { once: true });
+            ws.addEventListener('close', () => { clearTimeout(timer); resolve(false); }, { once: true });
+        });
+    }
+
     function createMessageElement(msg) {
         const userId = document.querySelector('meta[name="user-id"]')?.content;
         const isUser = msg.sender_id == userId;
         const messageDiv = document.createElement('div');
         messageDiv.className = `message ${isUser ? 'message-user' : 'message-support'}`;
+        messageDiv.dataset.messageId = msg.id;
 
         if (!isUser) {
             messageDiv.innerHTML = `
@@ -3,8 +3,75 @@ document.addEventListener('DOMContentLoaded', function() {
     if (messagesContainer) {
         messagesContainer.scrollTop = messagesContainer.scrollHeight;
     }
+
+    const loadOlderBtn = document.getElementById('loadOlderBtn');
+    if (loadOlderBtn) {
+        loadOlderBtn.addEventListener('click', () => loadOlderMessages(messagesContainer, loadOlderBtn));
+    }
 });
 
+function formatMessageDate(isoString) {
+    const date = new Date(isoString);
+    const pad = value => String(value).padStart(2, '0');
+    return `${pad(date.getDate())}.${pad(date.getMonth() + 1)}.${date.getFullYear()} ${pad(date.getHours())}:${pad(date.getMinutes())}`;
+}
+
+function createHistoryMessage(container, msg) {
+    const isUser = String(msg.sender_id) === container.dataset.userId;
+    const messageDiv = document.createElement('div');
+    messageDiv.className = `message ${isUser ? 'message-user' : 'message-support'}`;
+    messageDiv.dataset.messageId = msg.id;
+
+    if (!isUser) {
+        const sender = document.createElement('div');
+        sender.className = 'sender-name';
+        sender.textContent = `Оператор: ${container.dataset.employeeName}`;
+        messageDiv.appendChild(sender);
+    }
+
+    const content = document.createElement('div');
+    content.className = 'message-content';
+    const text = document.createElement('p');
+    text.className = 'message-text';
+    text.textContent = msg.message;
+    content.appendChild(text);
+    messageDiv.appendChild(content);
+
+    const info = document.createElement('div');
+    info.className = 'message-info';
+    info.textContent = formatMessageDate(msg.created_at);
+    messageDiv.appendChild(info);
+
+    return messageDiv;
+}
+
+async function loadOlderMessages(container, button) {
+    const cursor = container.dataset.olderCursor;
+    if (!cursor || button.disabled) return;
+    button.disabled = true;
+
+    try {
+        const params = new URLSearchParams({ before: cursor, limit: 50 });
+        const response = await fetch(`/messages/by_chat/${container.dataset.chatId}?${params}`);
+        const data = await response.json();
+        if (!response.ok) throw new Error(data.detail || 'Ошибка загрузки');
+
+        // сообщения приходят от новых к старым, вставляем над уже показанными с сохранением позиции прокрутки
+        const previousHeight = container.scrollHeight;
+        const fragment = document.createDocumentFragment();
+        data.messages.slice().reverse().forEach(msg => fragment.appendChild(createHistoryMessage(container, msg)));
+        button.after(fragment);
+        container.scrollTop += container.scrollHeight - previousHeight;
+
+        container.dataset.olderCursor = data.next_cursor || '';
+        if (!data.has_more) button.remove();
+    } catch (error) {
+        alert('Не удалось загрузить историю: ' + error.message);
+    } finally {
+        button.disabled = false;
+    }
+}
+
 async function closeChat(chatId) {
     if (!confirm('Вы уверены, что хотите завершить чат?')) {
         return;
@@ -1,4 +1,4 @@
-async function loadMoreChats(page) {
+async function loadMoreChats(page, archived = false) {
     const loadMoreBtn = document.querySelector('.js-load-more-container button');
     if (loadMoreBtn) {
         loadMoreBtn.disabled = true;
@@ -6,7 +6,7 @@ async function loadMoreChats(page) {
     }
 
     try {
-        const response = await fetch(`/chats/load-more?page=${page}`, {
+        const response = await fetch(`/chats/load-more?page=${page}${archived ? '&archived=1' : ''}`, {
             method: 'GET',
             headers: {
                 'Accept': 'text/html'
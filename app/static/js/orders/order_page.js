@@ -13,6 +13,25 @@ function initializeOrderPage() {
 
 function setupEventListeners() {
     setupProductItemsInteractions();
+    subscribeOrderStatus();
+}
+
+function subscribeOrderStatus() {
+    const statusEl = document.getElementById('order-status');
+    if (!statusEl || !window.EventSource) return;
+
+    const source = new EventSource('/orders/events', { withCredentials: true });
+    source.addEventListener('order_status_changed', e => {
+        const data = JSON.parse(e.data);
+        if (String(data.order_id) !== statusEl.dataset.orderId) return;
+        statusEl.textContent = data.status;
+        if (data.status !== 'Оформлен') {
+            const cancelBtn = document.querySelector('.btn-cancel');
+            if (cancelBtn) cancelBtn.remove();
+        }
+    });
+    // после переподключения LISTEN на сервере события за время разрыва потеряны - статус перечитывается
+    source.addEventListener('resync', () => window.location.reload());
 }
 
 async function cancelOrder(orderId) {
@@ -38,11 +38,33 @@ document.addEventListener('DOMContentLoaded', function() {
         }
         document.getElementById('orders').classList.add('active');
     }
+
+    if (document.getElementById('orders-container')) {
+        subscribeOrderStatuses();
+    }
 });
 
-async function loadMoreOrders(userId, page) {
+function subscribeOrderStatuses() {
+    if (!window.EventSource) return;
+    const source = new EventSource('/orders/events', { withCredentials: true });
+    source.addEventListener('order_status_changed', e => {
+        const data = JSON.parse(e.data);
+        const card = document.querySelector(`.order-card[data-order-id="${data.order_id}"]`);
+        if (!card) return;
+        card.querySelectorAll('[data-order-status]').forEach(el => {
+            el.textContent = data.status;
+            if (el.classList.contains('status')) {
+                el.className = `status ${data.status.toLowerCase()}`;
+            }
+        });
+    });
+    // после переподключения LISTEN на сервере события за время разрыва потеряны - статусы перечитываются
+    source.addEventListener('resync', () => window.location.reload());
+}
+
+async function loadMoreOrders(userId, cursor) {
     try {
-        const response = await fetch(`/orders/user/${userId}?page=${page}&per_page=5`);
+        const response = await fetch(`/orders/user/${userId}?cursor=${encodeURIComponent(cursor)}&per_page=5`);
 
         if (!response.ok) {
             throw new Error('Ошибка загрузки заказов');
@@ -59,7 +81,7 @@ async function loadMoreOrders(userId, page) {
             });
 
             if (data.pagination && data.pagination.has_next) {
-                document.getElementById('load-more-btn').setAttribute('onclick', `loadMoreOrders(${userId}, ${data.pagination.page + 1})`);
+                document.getElementById('load-more-btn').setAttribute('onclick', `loadMoreOrders(${userId}, '${data.pagination.next_cursor}')`);
             } else {
                 loadMoreContainer.style.display = 'none';
             }
@@ -74,6 +96,7 @@ async function loadMoreOrders(userId, page) {
 function createOrderCard(order) {
     const card = document.createElement('div');
     card.className = 'order-card';
+    card.dataset.orderId = order.id;
 
     const orderDate = new Date(order.date);
     const formattedDate = orderDate.toLocaleDateString('ru-RU', {
@@ -87,12 +110,12 @@ function createOrderCard(order) {
     card.innerHTML = `
         <div class="order-header">
             <h3>Заказ #${order.id}</h3>
-            <span class="status ${order.status.toLowerCase()}">${order.status}</span>
+            <span class="status ${order.status.toLowerCase()}" data-order-status>${order.status}</span>
         </div>
         <div class="order-details">
             <p>Дата: ${formattedDate}</p>
             <p>Сумма: ${order.summa} руб.</p>
-            <p>Статус: ${order.status}</p>
+            <p>Статус: <span data-order-status>${order.status}</span></p>
         </div>
         <a href="/orders/order/${order.id}" class="btn btn-primary">Подробнее о заказе</a>
     `;
@@ -0,0 +1,76 @@
+import csv
+import io
+
+from sqlalchemy import select
+
+from app_support.functions.main_func import apply_orders_filters, get_sort_column
+from config import Config
+from database.db import async_session_maker
+from models import Orders, User
+
+EXPORT_COLUMNS = ['Номер заказа', 'Дата', 'ID пользователя', 'Пользователь', 'Статус', 'Сумма']
+# с этих символов Excel начинает формулу
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def escape_csv_cell(value: str) -> str:
+    # пользовательский текст не должен исполняться как формула при открытии выгрузки
+    if value and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def build_orders_export_query(order_id=None,
+                              user_id=None,
+                              status=None,
+                              date_start=None,
+                              date_end=None,
+                              sum_from=None,
+                              sum_to=None,
+                              sort_by="date",
+                              sort_order="desc"
+):
+    stmt = (
+        select(Orders.id, Orders.date, Orders.user_id, User.first_name, User.last_name, Orders.status, Orders.summa)
+        .join(User, User.id == Orders.user_id)
+    )
+    stmt, _, _ = apply_orders_filters(stmt,
+                                      order_id=order_id,
+                                      user_id=user_id,
+                                      status=status,
+                                      date_start=date_start,
+                                      date_end=date_end,
+                                      sum_from=sum_from,
+                                      sum_to=sum_to)
+
+    sort_col = get_sort_column(sort_by)
+    if sort_order == "desc":
+        return stmt.order_by(sort_col.desc(), Orders.id.desc())
+    return stmt.order_by(sort_col.asc(), Orders.id.asc())
+
+
+async def stream_orders_csv(stmt, chunk_rows: int = Config.export_chunk_rows):
+    # строки читаются серверным курсором пачками по chunk_rows, в памяти держится только одна пачка
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=';')
+
+    buffer.write('\ufeff')  # BOM, чтобы Excel открыл файл в UTF-8
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()
+
+    # своя сессия: сессия из get_db закрывается до того, как ответ будет отдан
+    async with async_session_maker() as session:
+        result = await session.stream(stmt.execution_options(yield_per=chunk_rows))
+        async for rows in result.partitions():
+            buffer.seek(0)
+            buffer.truncate(0)
+            for row in rows:
+                writer.writerow([
+                    row.id,
+                    row.date.strftime('%Y-%m-%d %H:%M:%S') if row.date else '',
+                    row.user_id,
+                    escape_csv_cell(f"{row.first_name or ''} {row.last_name or ''}".strip()),
+                    escape_csv_cell(row.status),
+                    row.summa
+                ])
+            yield buffer.getvalue()
@@ -2,9 +2,59 @@ from typing import Optional
 from datetime import datetime
 from urllib.parse import urlencode
 
+from config import Statuses
 from models import Orders
 
 
+def get_all_statuses() -> list:
+    return [
+        value for attr, value in vars(Statuses).items()
+        if attr.isupper() and not attr.startswith('__')
+    ]
+
+
+def apply_orders_filters(stmt,
+                         order_id=None,
+                         user_id=None,
+                         status=None,
+                         date_start=None,
+                         date_end=None,
+                         sum_from=None,
+                         sum_to=None
+):
+    # общие фильтры главной страницы и выгрузки заказов
+    if order_id:
+        stmt = stmt.where(Orders.id.in_(order_id))
+    if user_id:
+        stmt = stmt.where(Orders.user_id.in_(user_id))
+    if status:
+        valid_statuses = [s for s in status if s in get_all_statuses()]
+        if valid_statuses:
+            stmt = stmt.where(Orders.status.in_(valid_statuses))
+
+    date_start_dt = None
+    date_end_dt = None
+    if date_start:
+        try:
+            date_start_dt = datetime.fromisoformat(date_start + "T00:00:00")
+            stmt = stmt.where(Orders.date >= date_start_dt)
+        except ValueError:
+            pass
+    if date_end:
+        try:
+            date_end_dt = datetime.fromisoformat(date_end + "T23:59:59")
+            stmt = stmt.where(Orders.date <= date_end_dt)
+        except ValueError:
+            pass
+
+    if sum_from is not None:
+        stmt = stmt.where(Orders.summa >= sum_from)
+    if sum_to is not None:
+        stmt = stmt.where(Orders.summa <= sum_to)
+
+    return stmt, date_start_dt, date_end_dt
+
+
 def get_sort_column(sort_by: str):
     mapping = {
         "id": Orders.id,
@@ -25,7 +75,9 @@ def build_pagination_url(order_id=None,
                          sum_to=None,
                          sort_by="date",
                          sort_order="desc",
-                         page=1,
+                         cursor=None,
+                         direction="next",
+                         with_count=False,
                          **overrides
 ):
     params = {}
@@ -38,13 +90,40 @@ def build_pagination_url(order_id=None,
     if sum_to is not None: params['sum_to'] = str(sum_to)
     params['sort_by'] = sort_by
     params['sort_order'] = sort_order
-    params['page'] = overrides.get('page', page)
+    if cursor: params['cursor'] = cursor
+    if cursor and direction == 'prev': params['direction'] = direction
+    if with_count: params['with_count'] = 'true'
 
     clean = {k: v for k, v in params.items() if v is not None and v != ""}
     query = urlencode(clean, doseq=True)
     return f"/?{query}" if query else "/"
 
 
+def build_export_url(order_id=None,
+                     user_id=None,
+                     status=None,
+                     date_start=None,
+                     date_end=None,
+                     sum_from=None,
+                     sum_to=None,
+                     sort_by="date",
+                     sort_order="desc"
+):
+    params = {}
+    if order_id: params['order_id'] = order_id
+    if user_id: params['user_id'] = user_id
+    if status: params['status'] = status
+    if date_start: params['date_start'] = date_start
+    if date_end: params['date_end'] = date_end
+    if sum_from is not None: params['sum_from'] = str(sum_from)
+    if sum_to is not None: params['sum_to'] = str(sum_to)
+    params['sort_by'] = sort_by
+    params['sort_order'] = sort_order
+
+    clean = {k: v for k, v in params.items() if v is not None and v != ""}
+    return f"/support/orders/export?{urlencode(clean, doseq=True)}"
+
+
 def build_sort_url(new_sort_by: str,
                    new_order: str,
                    order_id=None,
@@ -65,7 +144,6 @@ def build_sort_url(new_sort_by: str,
     if sum_to is not None: params['sum_to'] = str(sum_to)
     params['sort_by'] = new_sort_by
     params['sort_order'] = new_order
-    params['page'] = 1
 
     clean = {k: v for k, v in params.items() if v is not None and v != ""}
     query = urlencode(clean, doseq=True)
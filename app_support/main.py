@@ -1,8 +1,7 @@
+import asyncio
 import time
-from contextlib import asynccontextmanager
-from math import ceil
+from contextlib import asynccontextmanager, suppress
 from typing import Optional, List, AsyncGenerator
-from datetime import datetime
 from functools import partial
 
 from fastapi import FastAPI, Request, Query, Depends, Cookie
@@ -17,11 +16,18 @@ import logging
 
 from app.log.log import LOGGER
 from app.routers.auth import auto_refresh_token
-from app_support.functions.main_func import get_sort_column, build_pagination_url, build_sort_url, to_date_str
+from app_support.functions.main_func import (get_sort_column, build_pagination_url, build_sort_url, build_export_url,
+                                             to_date_str, apply_orders_filters, get_all_statuses)
+from database.crud.orders import get_orders_count_estimate
+from database.crud.users import search_users
 from database.db import engine, Base
-from models import Orders, User
+from models import Orders
 from general_functions.auth_func import checking_access_rights
-from app_support.routers import orders, auth, chats, messages
+from general_functions.broker import broker
+from general_functions.pagination_func import apply_keyset, encode_cursor
+from general_functions.sales_func import sales_rollup_scheduler
+from general_functions.archive_func import chat_archive_scheduler
+from app_support.routers import orders, auth, chats, messages, analytics
 from database.db_depends import get_db
 from config import Config, Statuses
 
@@ -34,8 +40,18 @@ logger.setLevel(logging.INFO)
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+
+    await broker.start()
+    rollups = asyncio.create_task(sales_rollup_scheduler())
+    archiver = asyncio.create_task(chat_archive_scheduler())
     yield
 
+    for task in (rollups, archiver):
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await broker.stop()
+
 
 class NoCacheStaticFiles(StaticFiles):
     def __init__(self, *args, **kwargs):
@@ -65,6 +81,7 @@ app.include_router(orders.router)
 app.include_router(auth.router)
 app.include_router(chats.router)
 app.include_router(messages.router)
+app.include_router(analytics.router)
 
 
 app.middleware("http")(auto_refresh_token)
@@ -144,78 +161,70 @@ async def get_main_page(request: Request,
                         sum_to: Optional[float] = None,
                         sort_by: str = Query("date"),
                         sort_order: str = Query("desc", regex="^(asc|desc)$"),
-                        page: int = Query(1, ge=1)
+                        cursor: Optional[str] = Query(None),
+                        direction: str = Query("next", regex="^(next|prev)$"),
+                        with_count: bool = Query(False)
 ):
     try:
         current_employee = await checking_access_rights(token=token, roles=['support'])
     except Exception:
         return RedirectResponse(url='/auth/create')
 
-    all_statuses = [
-        value for attr, value in vars(Statuses).items()
-        if attr.isupper() and not attr.startswith('__')
-    ]
+    all_statuses = get_all_statuses()
 
-    result = await db.execute(select(Orders.user_id).distinct())
-    users_ids = result.scalars().all()
-
-    if users_ids:
-        users_result = await db.execute(select(User).where(User.id.in_(users_ids)))
-        unique_users = users_result.scalars().all()
-        user_dict = {user.id: user for user in unique_users}
-    else:
-        user_dict = {}
-
-    all_orders_ids_result = await db.execute(select(Orders.id))
-    all_order_ids = [r[0] for r in all_orders_ids_result.fetchall()]
-    all_order_ids = sorted(all_order_ids, reverse=True)[:100]
-
-    stmt = select(Orders)
-
-    if order_id:
-        stmt = stmt.where(Orders.id.in_(order_id))
-    if user_id:
-        stmt = stmt.where(Orders.user_id.in_(user_id))
-    if status:
-        valid_statuses = [s for s in status if s in all_statuses]
-        if valid_statuses:
-            stmt = stmt.where(Orders.status.in_(valid_statuses))
-
-    date_start_dt = None
-    date_end_dt = None
-    if date_start:
-        try:
-            date_start_dt = datetime.fromisoformat(date_start + "T00:00:00")
-            stmt = stmt.where(Orders.date >= date_start_dt)
-        except ValueError:
-            pass
-    if date_end:
-        try:
-            date_end_dt = datetime.fromisoformat(date_end + "T23:59:59")
-            stmt = stmt.where(Orders.date <= date_end_dt)
-        except ValueError:
-            pass
-
-    if sum_from is not None:
-        stmt = stmt.where(Orders.summa >= sum_from)
-    if sum_to is not None:
-        stmt = stmt.where(Orders.summa <= sum_to)
+    stmt, date_start_dt, date_end_dt = apply_orders_filters(
+        select(Orders),
+        order_id=order_id,
+        user_id=user_id,
+        status=status,
+        date_start=date_start,
+        date_end=date_end,
+        sum_from=sum_from,
+        sum_to=sum_to
+    )
 
+    has_filters = stmt.whereclause is not None
     sort_col = get_sort_column(sort_by)
-
-    if sort_order == "asc":
-        stmt = stmt.order_by(sort_col.asc())
+    backward = direction == "prev" and cursor is not None
+
+    total_count = None
+    is_count_estimate = False
+    if with_count:
+        count_stmt = select(func.count()).select_from(Orders)
+        if has_filters:
+            count_stmt = count_stmt.where(stmt.whereclause)
+        total_count = (await db.execute(count_stmt)).scalar()
+    elif not has_filters:
+        total_count = await get_orders_count_estimate(db=db)
+        is_count_estimate = True
+
+    stmt = apply_keyset(stmt, sort_col, Orders.id,
+                        cursor=cursor,
+                        sort_desc=(sort_order == "desc"),
+                        backward=backward)
+    stmt = stmt.limit(Config.PAGE_SIZE + 1)
+    orders_with_extra = (await db.execute(stmt)).scalars().all()
+
+    has_more = len(orders_with_extra) > Config.PAGE_SIZE
+    orders = orders_with_extra[:Config.PAGE_SIZE]
+    if backward:
+        orders = list(reversed(orders))
+
+    has_next = (not backward and has_more) or backward
+    has_prev = (backward and has_more) or (not backward and cursor is not None)
+
+    sort_attr = sort_col.key
+    next_cursor = encode_cursor(getattr(orders[-1], sort_attr), orders[-1].id) if orders and has_next else None
+    prev_cursor = encode_cursor(getattr(orders[0], sort_attr), orders[0].id) if orders and has_prev else None
+
+    # пользователи только текущей страницы и выбранных в фильтре, остальные подгружаются поиском
+    page_user_ids = {order.user_id for order in orders} | set(user_id or [])
+    if page_user_ids:
+        users = await search_users(db=db, user_ids=list(page_user_ids), limit=len(page_user_ids))
+        user_dict = {user.id: user for user in users}
     else:
-        stmt = stmt.order_by(sort_col.desc())
-
-    count_stmt = select(func.count()).select_from(Orders)
-    if stmt.whereclause is not None:
-        count_stmt = count_stmt.where(stmt.whereclause)
-    total_count = (await db.execute(count_stmt)).scalar()
-    total_pages = ceil(total_count / Config.PAGE_SIZE) if total_count else 1
-
-    stmt = stmt.offset((page - 1) * Config.PAGE_SIZE).limit(Config.PAGE_SIZE)
-    orders = (await db.execute(stmt)).scalars().all()
+        user_dict = {}
+    selected_users = [user_dict[uid] for uid in (user_id or []) if uid in user_dict]
 
     date_start_date = to_date_str(date_start_dt)
     date_end_date = to_date_str(date_end_dt)
@@ -231,7 +240,22 @@ async def get_main_page(request: Request,
         sum_to=sum_to,
         sort_by=sort_by,
         sort_order=sort_order,
-        page=page
+        cursor=cursor,
+        direction=direction,
+        with_count=with_count
+    )
+
+    export_func = partial(
+        build_export_url,
+        order_id=order_id,
+        user_id=user_id,
+        status=status,
+        date_start=date_start,
+        date_end=date_end,
+        sum_from=sum_from,
+        sum_to=sum_to,
+        sort_by=sort_by,
+        sort_order=sort_order
     )
 
     sort_func = partial(
@@ -251,9 +275,9 @@ async def get_main_page(request: Request,
         "descr": Config.descr,
         "orders": orders,
         "user_dict": user_dict,
-        "unique_users": unique_users,
+        "selected_users": selected_users,
         "unique_statuses": all_statuses,
-        "all_order_ids": all_order_ids,
+        "status_transitions": {key: getattr(Statuses, key) for key in Statuses.changing_statuses},
         "order_ids": order_id or [],
         "user_ids": user_id or [],
         "status": status or [],
@@ -263,9 +287,16 @@ async def get_main_page(request: Request,
         "sum_to": sum_to,
         "current_sort_by": sort_by,
         "current_sort_order": sort_order,
-        "page": page,
-        "total_pages": total_pages,
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor,
+        "total_count": total_count,
+        "is_count_estimate": is_count_estimate,
+        "with_count": with_count,
+        # новые заказы вставляются в таблицу на лету только на первой странице без фильтров
+        "page_size": Config.PAGE_SIZE,
+        "live_insert": cursor is None and not has_filters and sort_by == "date" and sort_order == "desc",
         "is_authenticated": current_employee is not None,
         "build_pagination_url": pagination_func,
-        "build_sort_url": sort_func
+        "build_sort_url": sort_func,
+        "build_export_url": export_func
     })
\ No newline at end of file
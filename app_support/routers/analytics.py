@@ -0,0 +1,63 @@
+from datetime import date, timedelta
+from typing import Optional, List
+
+from fastapi import APIRouter, Depends, status, HTTPException, Cookie, Request, Query
+from fastapi.templating import Jinja2Templates
+from fastapi.responses import HTMLResponse, RedirectResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app_support.functions.main_func import get_all_statuses
+from config import Config
+from database.crud.sales import get_sales_by_day, get_sales_by_status, get_sales_by_category, get_sales_by_product
+from database.db_depends import get_db
+from general_functions.auth_func import checking_access_rights
+
+router = APIRouter(prefix='/support/analytics', tags=['analytics'])
+templates = Jinja2Templates(directory='app_support/templates')
+
+
+@router.get('/', response_class=HTMLResponse)
+async def get_analytics_page(request: Request,
+                             date_from: Optional[date] = Query(None),
+                             date_to: Optional[date] = Query(None),
+                             status_filter: Optional[List[str]] = Query(None, alias='status'),
+                             token: Optional[str] = Cookie(None, alias='token'),
+                             db: AsyncSession = Depends(get_db)
+):
+    try:
+        await checking_access_rights(token=token, roles=['support'])
+    except HTTPException as e:
+        if e.status_code in (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN):
+            return RedirectResponse(url='/auth/create', status_code=status.HTTP_303_SEE_OTHER)
+        raise
+
+    # страница читает только витрины sales_daily*, таблица orders не затрагивается
+    date_to = date_to or date.today()
+    date_from = date_from or date_to - timedelta(days=29)
+    all_statuses = get_all_statuses()
+    statuses = [s for s in (status_filter or []) if s in all_statuses]
+
+    by_day = await get_sales_by_day(db=db, date_from=date_from, date_to=date_to, statuses=statuses)
+    by_status = await get_sales_by_status(db=db, date_from=date_from, date_to=date_to)
+    by_category = await get_sales_by_category(db=db, date_from=date_from, date_to=date_to, statuses=statuses)
+    by_product = await get_sales_by_product(db=db, date_from=date_from, date_to=date_to, statuses=statuses)
+
+    return templates.TemplateResponse('analytics/analytics.html', {
+        "request": request,
+        "shop_name": Config.shop_name,
+        "descr": Config.descr,
+        "is_authenticated": True,
+        "date_from": date_from,
+        "date_to": date_to,
+        "all_statuses": all_statuses,
+        "statuses": statuses,
+        "by_day": by_day,
+        "by_status": by_status,
+        "by_category": by_category,
+        "by_product": by_product,
+        "totals": {
+            "revenue": sum(row.revenue for row in by_day),
+            "orders_count": sum(row.orders_count for row in by_day),
+            "units": sum(row.units for row in by_day)
+        }
+    })
@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date
 from typing import Optional
 
 from fastapi import APIRouter, Depends, status, HTTPException, Cookie, Request, Query
@@ -6,14 +6,15 @@ from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse, RedirectResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import selectinload, joinedload
 
-from database.crud.chats import get_chat
+from database.crud.archive import get_archived_chats
+from database.crud.chats import get_chat, update_chat_status, mark_chat_read, get_unread_counts, search_chats
 from database.crud.decorators import handler_base_errors
 from database.crud.users import get_user
 from database.db_depends import get_db
-from database.crud.messages import get_message
-from models import Chats
+from database.crud.messages import get_messages_page
+from models import Chats, ChatsArchive
 from config import Config
 from general_functions.auth_func import checking_access_rights
 
@@ -37,30 +38,30 @@ async def get_all_chats(request: Request,
 
         active = True if status_filter == "active" else None
 
-        query = (
-            select(Chats)
-            .options(selectinload(Chats.employee))
-            .where(Chats.employee_id == employee_id)
-        )
-
-        if active is not None:
-            query = query.where(Chats.active == active)
-
-        if sort == "desc":
-            query = query.order_by(Chats.created_at.desc())
+        if status_filter == "archived":
+            chats_with_extra = await get_archived_chats(employee_id=employee_id, sort_desc=(sort == "desc"),
+                                                        limit=11, db=db)
         else:
-            query = query.order_by(Chats.created_at.asc())
-
-        query = query.limit(11)
-        result = await db.execute(query)
-        chats_with_extra = result.scalars().all()
+            query = (
+                select(Chats)
+                .options(selectinload(Chats.employee), joinedload(Chats.last_message))
+                .where(Chats.employee_id == employee_id)
+            )
+
+            if active is not None:
+                query = query.where(Chats.active == active)
+
+            if sort == "desc":
+                query = query.order_by(Chats.created_at.desc())
+            else:
+                query = query.order_by(Chats.created_at.asc())
+
+            query = query.limit(11)
+            result = await db.execute(query)
+            chats_with_extra = result.scalars().all()
         has_more = len(chats_with_extra) > 10
         chats = chats_with_extra[:10]
 
-        for chat in chats:
-            last_msg = await get_message(chat_id=chat.id, sort_desc=True, limit=1, db=db)
-            chat.last_message = last_msg
-
         return templates.TemplateResponse("chats/chat_list.html", {
             "request": request,
             "chats": chats,
@@ -97,21 +98,22 @@ async def get_chats_partial(request: Request,
         limit = 10
         offset = (page - 1) * limit
 
-        chats_with_extra = await get_chat(
-            employee_id=employee_id,
-            sort_desc=(sort == "desc"),
-            active=active,
-            offset=offset,
-            limit=limit + 1,
-            db=db
-        )
+        if status_filter == "archived":
+            chats_with_extra = await get_archived_chats(employee_id=employee_id, sort_desc=(sort == "desc"),
+                                                        offset=offset, limit=limit + 1, db=db)
+        else:
+            chats_with_extra = await get_chat(
+                employee_id=employee_id,
+                sort_desc=(sort == "desc"),
+                active=active,
+                offset=offset,
+                limit=limit + 1,
+                with_last_message=True,
+                db=db
+            )
         has_more = len(chats_with_extra) > limit
         chats = chats_with_extra[:limit]
 
-        for chat in chats:
-            last_msg = await get_message(chat_id=chat.id, sort_desc=True, limit=1, db=db)
-            chat.last_message = last_msg
-
         return templates.TemplateResponse("chats/chat_items.html", {
             "request": request,
             "chats": chats,
@@ -128,6 +130,72 @@ async def get_chats_partial(request: Request,
             raise
 
 
+@router.get('/unread')
+@handler_base_errors
+async def get_unread(db: AsyncSession = Depends(get_db),
+                     token: Optional[str] = Cookie(None, alias='token')
+):
+    try:
+        employee_id = await checking_access_rights(token=token, roles=['support'])
+
+        unread = await get_unread_counts(employee_id=employee_id, db=db)
+        return {"total": sum(unread.values()), "chats": unread}
+
+    except HTTPException as e:
+        if e.status_code in (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN):
+            return RedirectResponse(url='/auth/create', status_code=status.HTTP_303_SEE_OTHER)
+        else:
+            raise
+
+
+@router.get('/search')
+@handler_base_errors
+async def chats_search(q: str = Query(..., min_length=2, max_length=200, description="Поисковый запрос"),
+                       employee_id: Optional[int] = Query(None, description="Оператор чата"),
+                       user_id: Optional[int] = Query(None, description="Покупатель"),
+                       date_from: Optional[date] = None,
+                       date_to: Optional[date] = None,
+                       cursor: Optional[str] = Query(None, description="Курсор следующей страницы"),
+                       limit: int = Query(20, ge=1, le=50),
+                       db: AsyncSession = Depends(get_db),
+                       token: Optional[str] = Cookie(None, alias='token')
+):
+    try:
+        await checking_access_rights(token=token, roles=['support'])
+
+        rows, next_cursor = await search_chats(query=q,
+                                               employee_id=employee_id,
+                                               user_id=user_id,
+                                               date_from=date_from,
+                                               date_to=date_to,
+                                               cursor=cursor,
+                                               limit=limit,
+                                               db=db)
+        return {
+            'results': [
+                {
+                    'chat_id': row.chat_id,
+                    'message_id': row.message_id,
+                    'topic': row.topic,
+                    'user_id': row.user_id,
+                    'employee_id': row.employee_id,
+                    'created_at': row.created_at.isoformat() if row.created_at else None,
+                    'snippet': row.snippet,
+                    'archived': row.archived
+                }
+                for row in rows
+            ],
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        }
+
+    except HTTPException as e:
+        if e.status_code in (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN):
+            return RedirectResponse(url='/auth/create', status_code=status.HTTP_303_SEE_OTHER)
+        else:
+            raise
+
+
 @router.get('/{chat_id}')
 @handler_base_errors
 async def chat_by_id(chat_id: int,
@@ -151,6 +219,34 @@ async def chat_by_id(chat_id: int,
             raise
 
 
+@router.post('/{chat_id}/read')
+@handler_base_errors
+async def chat_read(chat_id: int,
+                    message_id: Optional[int] = None,
+                    db: AsyncSession = Depends(get_db),
+                    token: Optional[str] = Cookie(None, alias='token')
+):
+    try:
+        employee_id = await checking_access_rights(token=token, roles=['support'])
+
+        chat = await get_chat(chat_id=chat_id, db=db)
+        if not chat:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                detail='Чат не найден')
+        if chat.employee_id != employee_id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                                detail='Нет прав для доступа')
+
+        unread = await mark_chat_read(chat_id=chat_id, as_employee=True, message_id=message_id, db=db)
+        return {"chat_id": chat_id, "unread": unread}
+
+    except HTTPException as e:
+        if e.status_code == status.HTTP_401_UNAUTHORIZED:
+            return RedirectResponse(url='/auth/create', status_code=status.HTTP_303_SEE_OTHER)
+        else:
+            raise
+
+
 @router.get('/{chat_id}/view', response_class=HTMLResponse)
 async def view_chat(request: Request,
                     chat_id: int,
@@ -160,7 +256,7 @@ async def view_chat(request: Request,
     try:
         employee_id = await checking_access_rights(token=token, roles=['support'])
 
-        chat = await get_chat(chat_id=chat_id, db=db)
+        chat = await get_chat(chat_id=chat_id, include_archived=True, db=db)
         if not chat:
             return templates.TemplateResponse("exceptions/not_found.html", {"request": request})
 
@@ -172,12 +268,19 @@ async def view_chat(request: Request,
         if not employee:
             return templates.TemplateResponse("exceptions/not_found.html", {"request": request})
 
-        messages = await get_message(chat_id=chat_id, sort_asc=True, db=db)
+        archived = isinstance(chat, ChatsArchive)
+        rows, older_cursor = await get_messages_page(db=db, chat_id=chat_id, limit=Config.chat_window_size,
+                                                     archived=archived)
+        messages = [message for message, _ in reversed(rows)]
+
+        if chat.employee_id == employee_id and not archived:
+            await mark_chat_read(chat_id=chat_id, as_employee=True, db=db)
 
         return templates.TemplateResponse('chats/chat_detail.html', {
             'request': request,
             'chat': chat,
             'messages': messages,
+            'older_cursor': older_cursor,
             'client': client,
             'employee': employee,
             'is_active': chat.active,
@@ -201,13 +304,7 @@ async def complete_chat(chat_id: int,
     try:
         await checking_access_rights(token=token, roles=['support'])
 
-        chat = await get_chat(chat_id=chat_id, db=db)
-        if not chat:
-            raise HTTPException(status_code=404)
-
-        chat.active = False
-        chat.completed_at = datetime.utcnow()
-        await db.commit()
+        await update_chat_status(chat_id=chat_id, db=db)
 
         return RedirectResponse(url=f"/support/chats/{chat_id}/view", status_code=303)
 
@@ -1,19 +1,59 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Cookie, Form
+from fastapi import APIRouter, Depends, HTTPException, Cookie, Form, Query, WebSocket, status
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import RedirectResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from general_functions.auth_func import checking_access_rights
+from general_functions.chat_func import run_chat_socket
 from database.crud.chats import get_chat
-from database.crud.messages import create_message
+from database.crud.messages import create_message, get_messages_page
 from database.db_depends import get_db
+from models import ChatsArchive
 
 router = APIRouter(prefix='/support/messages', tags=['messages'])
 templates = Jinja2Templates(directory='app_support/templates')
 
 
+@router.get('/by_chat/{chat_id}')
+async def messages_by_chat_id(chat_id: int,
+                              before: Optional[str] = Query(None, description="Курсор самого старого загруженного сообщения"),
+                              limit: int = Query(50, ge=1, le=100),
+                              token: Optional[str] = Cookie(None, alias='token'),
+                              db: AsyncSession = Depends(get_db)
+):
+    try:
+        await checking_access_rights(token=token, roles=['support'])
+
+        chat = await get_chat(chat_id=chat_id, include_archived=True, db=db)
+        if not chat:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Чат не найден')
+
+        rows, next_cursor = await get_messages_page(db=db, chat_id=chat_id, before=before, limit=limit,
+                                                    archived=isinstance(chat, ChatsArchive))
+        return {
+            'messages': [
+                {
+                    'id': msg.id,
+                    'chat_id': msg.chat_id,
+                    'sender_id': msg.sender_id,
+                    'sender_name': sender_name,
+                    'message': msg.message,
+                    'created_at': msg.created_at.isoformat() if msg.created_at else None
+                }
+                for msg, sender_name in rows
+            ],
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        }
+
+    except HTTPException as e:
+        if e.status_code == 401:
+            return RedirectResponse(url="/auth/create", status_code=303)
+        raise
+
+
 @router.post('/{chat_id}/send')
 async def send_message(chat_id: int,
                        message: str = Form(...),
@@ -29,7 +69,8 @@ async def send_message(chat_id: int,
 
         await create_message(chat_id=chat_id,
                              sender_id=employee_id,
-                             message=message
+                             message=message,
+                             db=db
         )
         return RedirectResponse(url=f"/support/chats/{chat_id}/view", status_code=303)
 
@@ -37,3 +78,24 @@ async def send_message(chat_id: int,
         if e.status_code == 401:
             return RedirectResponse(url="/auth/create", status_code=303)
         raise
+
+
+@router.websocket('/ws/{chat_id}')
+async def messages_socket(websocket: WebSocket,
+                          chat_id: int,
+                          token: Optional[str] = Cookie(None, alias='token'),
+                          db: AsyncSession = Depends(get_db)
+):
+    try:
+        employee_id = await checking_access_rights(token=token, roles=['support'])
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    chat = await get_chat(chat_id=chat_id, db=db)
+    if not chat:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await db.close()
+
+    await run_chat_socket(websocket, chat=chat, sender_id=employee_id)
@@ -1,55 +1,118 @@
+from datetime import datetime
+from typing import Optional, List
+
 from fastapi import APIRouter, Depends, status, HTTPException, Query, Request, Cookie
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import select
-from starlette.responses import HTMLResponse, RedirectResponse
+from starlette.responses import HTMLResponse, RedirectResponse, StreamingResponse
 
+from app_support.functions.export_func import build_orders_export_query, stream_orders_csv
 from config import Config
-from database.crud.orders import get_orders, update_status
-from database.crud.users import get_user
+from database.crud.orders import get_orders, update_status, search_order_ids
+from database.crud.users import get_user, search_users
 from database.db_depends import get_db
 from general_functions.auth_func import checking_access_rights
-from general_functions.product_func import update_stock
-from schemas import ChangeOrderStatus
+from general_functions.broker import sse_stream, ORDER_EVENTS_CHANNEL
+from general_functions.orders_func import (build_order_lines, cancel_order_with_restock, change_orders_status,
+                                           fetch_orders_for_user)
+from schemas import ChangeOrderStatus, ChangeOrdersStatus
 from models import *
 
 router = APIRouter(prefix='/support', tags=['orders'])
 templates = Jinja2Templates(directory='app_support/templates/')
 
 
+@router.get('/filters/users')
+async def filter_users(q: Optional[str] = Query(None, max_length=100, description="Имя, фамилия, логин или ID"),
+                       limit: int = Query(20, ge=1, le=50),
+                       db: AsyncSession = Depends(get_db),
+                       token: str = Cookie(None, alias='token')
+) -> list:
+    await checking_access_rights(token=token, roles=['support'])
+
+    users = await search_users(db=db, query=q, with_orders=True, limit=limit)
+    return [
+        {
+            'id': user.id,
+            'name': f"{user.first_name or ''} {user.last_name or ''}".strip() or 'Без имени'
+        }
+        for user in users
+    ]
+
+
+@router.get('/filters/orders')
+async def filter_orders(q: Optional[str] = Query(None, max_length=18, description="Начало номера заказа"),
+                        limit: int = Query(20, ge=1, le=50),
+                        db: AsyncSession = Depends(get_db),
+                        token: str = Cookie(None, alias='token')
+) -> list:
+    await checking_access_rights(token=token, roles=['support'])
+
+    return await search_order_ids(db=db, query=q, limit=limit)
+
+
+@router.get('/orders/export')
+async def export_orders(token: str = Cookie(None, alias='token'),
+                        status: Optional[List[str]] = Query(None),
+                        user_id: Optional[List[int]] = Query(None),
+                        order_id: Optional[List[int]] = Query(None),
+                        date_start: Optional[str] = None,
+                        date_end: Optional[str] = None,
+                        sum_from: Optional[float] = None,
+                        sum_to: Optional[float] = None,
+                        sort_by: str = Query("date"),
+                        sort_order: str = Query("desc", regex="^(asc|desc)$")
+):
+    await checking_access_rights(token=token, roles=['support'])
+
+    stmt = build_orders_export_query(order_id=order_id,
+                                     user_id=user_id,
+                                     status=status,
+                                     date_start=date_start,
+                                     date_end=date_end,
+                                     sum_from=sum_from,
+                                     sum_to=sum_to,
+                                     sort_by=sort_by,
+                                     sort_order=sort_order)
+
+    filename = f"orders_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    return StreamingResponse(
+        stream_orders_csv(stmt),
+        media_type='text/csv; charset=utf-8',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get('/orders/events')
+async def orders_events(request: Request,
+                        token: str = Cookie(None, alias='token')
+):
+    await checking_access_rights(token=token, roles=['support'])
+
+    return StreamingResponse(
+        sse_stream(request, ORDER_EVENTS_CHANNEL),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 @router.get('/user/{user_id}')
 async def get_orders_by_user_id(user_id: int,
-                                page: int = Query(1, ge=1, description="Номер страницы"),
+                                cursor: Optional[str] = Query(None, description="Курсор следующей страницы"),
                                 per_page: int = Query(5, ge=1, le=50, description="Количество заказов на странице"),
+                                with_count: bool = Query(False, description="Посчитать общее количество заказов"),
                                 db: AsyncSession = Depends(get_db),
                                 token: str = Cookie(None, alias='token')
 ):
     try:
         await checking_access_rights(token=token, roles=['support'])
-        total_count = await get_orders(func_count=True,
-                                       user_id=user_id,
-                                       db=db)
-        offset = (page - 1) * per_page
-
-        orders = await get_orders(sort_desc=True,
-                                  user_id=user_id,
-                                  offset=offset,
-                                  limit=per_page,
-                                  db=db)
-        total_pages = (total_count + per_page - 1) // per_page
 
-        return {
-            "orders": orders,
-            "pagination": {
-                "page": page,
-                "per_page": per_page,
-                "total_count": total_count,
-                "total_pages": total_pages,
-                "has_next": page < total_pages,
-                "has_prev": page > 1
-            }
-        }
+        return await fetch_orders_for_user(user_id=user_id,
+                                           per_page=per_page,
+                                           cursor=cursor,
+                                           with_count=with_count,
+                                           db=db)
 
     except HTTPException as e:
         if e.status_code in (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN):
@@ -71,11 +134,10 @@ async def change_status(order_id: int,
     try:
         await checking_access_rights(token=token, roles=['support'])
 
-        await update_status(order_id=order_id, new_status=status_obj.new_status, db=db)
         if status_obj.new_status == 'CANCELLED':
-            order = await get_orders(db=db, order_id=order_id)
-            for product_id, product_info in order.products.items():
-                await update_stock(product_id=int(product_id), count=product_info['count'], db=db, add=True)
+            await cancel_order_with_restock(order_id=order_id, db=db)
+        else:
+            await update_status(order_id=order_id, new_status=status_obj.new_status, db=db)
         return {'message': f'Статус заказа изменен'}
 
     except SQLAlchemyError as e:
@@ -86,6 +148,30 @@ async def change_status(order_id: int,
         )
 
 
+@router.patch('/change_status')
+async def change_status_bulk(status_obj: ChangeOrdersStatus,
+                             token: str = Cookie(None, alias='token'),
+                             db: AsyncSession = Depends(get_db)) -> dict:
+    try:
+        await checking_access_rights(token=token, roles=['support'])
+
+        results = await change_orders_status(order_ids=status_obj.order_ids,
+                                             new_status=status_obj.new_status,
+                                             db=db)
+
+        return {
+            'updated': sum(1 for result in results.values() if result['updated']),
+            'results': [{'order_id': order_id, **results[order_id]} for order_id in sorted(results)]
+        }
+
+    except SQLAlchemyError as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Ошибка базы данных: {str(e)}"
+        )
+
+
 @router.get('/order/{order_id}', response_class=HTMLResponse)
 async def get_order_detail(request: Request,
                            order_id: int,
@@ -102,27 +188,10 @@ async def get_order_detail(request: Request,
                 {"request": request}
             )
 
-        order_products = []
-        total_amount = 0
-
         user = await get_user(db=db, user_id=order.user_id)
 
-        for product_id, product_data in order.products.items():
-            product_query = select(Product).where(Product.id == int(product_id))
-            product_result = await db.execute(product_query)
-            product = product_result.scalar_one_or_none()
-
-            if product:
-                item_total = product_data['count'] * product_data['price']
-                order_products.append({
-                    'id': product.id,
-                    'name': product.name,
-                    'price': product_data['price'],
-                    'count': product_data['count'],
-                    'image_url': product.image_urls[0],
-                    'item_total': item_total
-                })
-                total_amount += item_total
+        order_products, total_amount = await build_order_lines(order=order, db=db)
+
         order.date = order.date.strftime("%Y-%m-%d %H:%M")
 
         context = {
@@ -1,8 +1,35 @@
+const UNREAD_POLL_INTERVAL = 30000;
+
 document.addEventListener('DOMContentLoaded', function() {
     initUserDropdown();
+    initUnreadBadge();
 });
 
 
+function initUnreadBadge() {
+    const badge = document.getElementById('chatsUnreadBadge');
+    if (!badge) return;
+
+    async function refresh() {
+        if (document.hidden) return;
+        try {
+            const response = await fetch('/support/chats/unread', { headers: { 'Accept': 'application/json' } });
+            if (!response.ok) return;
+            const data = await response.json();
+            badge.textContent = data.total;
+            badge.hidden = !data.total;
+        } catch (error) {
+            // счетчик необязателен, ошибки сети просто пропускаем до следующего опроса
+        }
+    }
+
+    refresh();
+    setInterval(refresh, UNREAD_POLL_INTERVAL);
+    document.addEventListener('visibilitychange', refresh);
+    window.refreshUnreadBadge = refresh;
+}
+
+
 function initUserDropdown() {
     const userIcon = document.getElementById('userIcon');
     const userDropdown = document.getElementById('userDropdown');
@@ -11,6 +11,153 @@ function closeClientInfo() {
 document.addEventListener('DOMContentLoaded', () => {
     const container = document.querySelector('.messages-area');
     container.scrollTop = container.scrollHeight;
+
+    if (container.dataset.active === 'true') {
+        connectChatSocket(container);
+    }
+
+    const loadOlderBtn = document.getElementById('load-older');
+    if (loadOlderBtn) {
+        loadOlderBtn.addEventListener('click', () => loadOlderMessages(container, loadOlderBtn));
+    }
+});
+
+let chatSocket = null;
+let chatReconnectDelay = 2000;
+const CHAT_RECONNECT_MAX_DELAY = 30000;
+
+function formatMessageTime(isoString) {
+    const date = new Date(isoString);
+    const pad = value => String(value).padStart(2, '0');
+    return `${pad(date.getDate())}.${pad(date.getMonth() + 1)}.${date.getFullYear()} ${pad(date.getHours())}:${pad(date.getMinutes())}`;
+}
+
+function createMessageBubble(container, msg) {
+    const isEmployee = String(msg.sender_id) === container.dataset.employeeId;
+    const bubble = document.createElement('div');
+    bubble.className = `message-bubble ${isEmployee ? 'employee-message' : 'client-message'}`;
+    bubble.dataset.messageId = msg.id;
+
+    if (!isEmployee) {
+        const label = document.createElement('div');
+        label.className = 'sender-label';
+        label.textContent = 'Пользователь';
+        bubble.appendChild(label);
+    }
+
+    const content = document.createElement('div');
+    content.className = 'message-content';
+    content.textContent = msg.message;
+    bubble.appendChild(content);
+
+    const time = document.createElement('div');
+    time.className = 'message-time';
+    time.textContent = formatMessageTime(msg.created_at);
+    bubble.appendChild(time);
+
+    return bubble;
+}
+
+function appendMessageBubble(container, msg) {
+    if (container.querySelector(`[data-message-id="${msg.id}"]`)) return;
+    container.appendChild(createMessageBubble(container, msg));
+    container.scrollTop = container.scrollHeight;
+}
+
+async function loadOlderMessages(container, button) {
+    const cursor = container.dataset.olderCursor;
+    if (!cursor || button.disabled) return;
+    button.disabled = true;
+
+    try {
+        const params = new URLSearchParams({ before: cursor, limit: 50 });
+        const response = await fetch(`/support/messages/by_chat/${container.dataset.chatId}?${params}`);
+        const data = await response.json();
+        if (!response.ok) throw new Error(data.detail || 'Ошибка загрузки');
+
+        // сообщения приходят от новых к старым, вставляем над уже показанными с сохранением позиции прокрутки
+        const previousHeight = container.scrollHeight;
+        const fragment = document.createDocumentFragment();
+        data.messages.slice().reverse().forEach(msg => fragment.appendChild(createMessageBubble(container, msg)));
+        button.after(fragment);
+        container.scrollTop += container.scrollHeight - previousHeight;
+
+        container.dataset.olderCursor = data.next_cursor || '';
+        if (!data.has_more) button.remove();
+    } catch (error) {
+        alert('Не удалось загрузить историю: ' + error.message);
+    } finally {
+        button.disabled = false;
+    }
+}
+
+async function markChatRead(container) {
+    if (document.hidden) return;
+    try {
+        const response = await fetch(`/support/chats/${container.dataset.chatId}/read`, { method: 'POST' });
+        if (response.ok && window.refreshUnreadBadge) window.refreshUnreadBadge();
+    } catch (error) {
+        // отметка повторится при следующем сообщении или открытии чата
+    }
+}
+
+function connectChatSocket(container) {
+    const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
+    const ws = new WebSocket(`${protocol}://${window.location.host}/support/messages/ws/${container.dataset.chatId}`);
+
+    ws.addEventListener('open', () => {
+        chatReconnectDelay = 2000;
+    });
+
+    ws.addEventListener('message', e => {
+        const data = JSON.parse(e.data);
+        if (data.event === 'message_created') {
+            appendMessageBubble(container, data);
+            if (String(data.sender_id) !== container.dataset.employeeId) markChatRead(container);
+        } else if (data.event === 'resync') {
+            // часть сообщений могла потеряться при разрыве, перерисовываем, если оператор ничего не набирает
+            const textarea = document.querySelector('.message-form textarea[name="message"]');
+            if (!textarea || !textarea.value.trim()) window.location.reload();
+        } else if (data.event === 'error') {
+            if (data.detail === 'Чат неактивен') {
+                // чат закрыт собеседником - сокет больше не нужен
+                container.dataset.active = 'false';
+                ws.close(1000);
+            }
+            alert('Ошибка: ' + data.detail);
+        }
+    });
+
+    ws.addEventListener('close', e => {
+        if (chatSocket !== ws) return;
+        chatSocket = null;
+        // 1000 - штатное закрытие, 1008 - нет доступа или чат не найден: переподключение не поможет
+        if (e.code === 1000 || e.code === 1008 || container.dataset.active !== 'true') return;
+
+        const delay = chatReconnectDelay;
+        if (e.code === 1011 || e.code === 1013) {
+            // ошибка или перегрузка сервера - увеличиваем паузу между попытками
+            chatReconnectDelay = Math.min(chatReconnectDelay * 2, CHAT_RECONNECT_MAX_DELAY);
+        }
+        setTimeout(() => {
+            if (!chatSocket && container.dataset.active === 'true') connectChatSocket(container);
+        }, delay);
+    });
+
+    chatSocket = ws;
+}
+
+document.addEventListener('submit', e => {
+    const form = e.target.closest('.message-form');
+    if (!form || !chatSocket || chatSocket.readyState !== WebSocket.OPEN) return;
+
+    // сокет открыт - отправляем без перезагрузки страницы, иначе работает обычная отправка формы
+    e.preventDefault();
+    const textarea = form.querySelector('textarea[name="message"]');
+    const text = textarea.value.trim();
+    if (!text) return;
+    chatSocket.send(JSON.stringify({ message: text }));
+    textarea.value = '';
 });
 
 async function completeChat(chatId) {
@@ -27,6 +174,9 @@ async function completeChat(chatId) {
         });
 
         if (response.ok) {
+            const container = document.querySelector('.messages-area');
+            if (container) container.dataset.active = 'false';
+            if (chatSocket) chatSocket.close(1000);
             alert('Чат успешно завершён');
             window.location.reload();
         } else {
@@ -24,10 +24,14 @@ function updateOrderStatus(orderId) {
         },
         body: JSON.stringify({ new_status: new_status })
     })
-    .then(response => {
+    .then(async response => {
         if (response.ok) {
             alert('Статус успешно обновлён');
             window.location.reload();
+        } else if (response.status === 409) {
+            const error = await response.json();
+            alert(error.detail || 'Статус заказа уже изменён другим сотрудником');
+            window.location.reload();
         } else {
             alert('Ошибка при обновлении статуса');
         }
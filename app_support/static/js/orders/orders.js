@@ -11,6 +11,10 @@ document.querySelectorAll('.filter-trigger').forEach(trigger => {
         closeAllFilters();
         if (!isActive) {
             container.classList.add('active');
+            const search = container.querySelector('.filter-search');
+            if (search && !container.dataset.loaded) {
+                filterDropdown(search, container.dataset.filter);
+            }
         }
         e.stopPropagation();
     });
@@ -22,14 +26,62 @@ document.addEventListener('click', function(e) {
     }
 });
 
+const FILTER_SOURCES = {
+    order_id: {
+        url: '/support/filters/orders',
+        label: orderId => `Заказ #${orderId}`,
+        value: orderId => orderId
+    },
+    user_id: {
+        url: '/support/filters/users',
+        label: user => `${user.name} (ID: ${user.id})`,
+        value: user => user.id
+    }
+};
+
+const filterSearchTimers = {};
+
 function filterDropdown(input, filterKey) {
-    const container = input.closest('.dropdown-filter');
-    const labels = container.querySelectorAll('.filter-options label');
-    const query = input.value.toLowerCase();
-    labels.forEach(label => {
-        const text = label.textContent.toLowerCase();
-        label.style.display = text.includes(query) ? '' : 'none';
-    });
+    const source = FILTER_SOURCES[filterKey];
+    if (!source) return;
+
+    clearTimeout(filterSearchTimers[filterKey]);
+    filterSearchTimers[filterKey] = setTimeout(async () => {
+        const container = input.closest('.dropdown-filter-container');
+        const options = container.querySelector('.filter-options');
+        const params = new URLSearchParams({ limit: 20 });
+        const query = input.value.trim();
+        if (query) params.set('q', query);
+
+        try {
+            const response = await fetch(`${source.url}?${params}`, { credentials: 'include' });
+            if (!response.ok) return;
+            const items = await response.json();
+            container.dataset.loaded = '1';
+
+            // выбранные значения остаются в списке, остальные заменяются результатами поиска
+            options.querySelectorAll('label').forEach(label => {
+                if (!label.querySelector('input').checked) label.remove();
+            });
+            const selected = new Set(
+                Array.from(options.querySelectorAll('input:checked')).map(ch => ch.value)
+            );
+
+            items.forEach(item => {
+                const value = String(source.value(item));
+                if (selected.has(value)) return;
+                const label = document.createElement('label');
+                const checkbox = document.createElement('input');
+                checkbox.type = 'checkbox';
+                checkbox.value = value;
+                label.appendChild(checkbox);
+                label.appendChild(document.createTextNode(' ' + source.label(item)));
+                options.appendChild(label);
+            });
+        } catch (error) {
+            console.error('Ошибка поиска по фильтру:', error);
+        }
+    }, 250);
 }
 
 function applyFilters() {
@@ -57,13 +109,12 @@ function applyFilters() {
     if (sort_by) params.set('sort_by', sort_by);
     if (sort_order) params.set('sort_order', sort_order);
 
-    params.set('page', '1');
     window.location.search = params.toString();
 }
 
-document.querySelectorAll('.clickable-row').forEach(row => {
+function bindOrderRow(row) {
     row.addEventListener('click', function(e) {
-        if (e.target.tagName === 'A' || e.target.tagName === 'BUTTON' || e.target.closest('a, button')) {
+        if (e.target.tagName === 'A' || e.target.tagName === 'BUTTON' || e.target.closest('a, button, .select-cell')) {
             return;
         }
         const href = this.getAttribute('data-href');
@@ -71,4 +122,149 @@ document.querySelectorAll('.clickable-row').forEach(row => {
             window.location.href = href;
         }
     });
-});
\ No newline at end of file
+}
+
+document.querySelectorAll('.clickable-row').forEach(bindOrderRow);
+
+function getSelectedOrderIds() {
+    return Array.from(document.querySelectorAll('.order-select:checked')).map(ch => Number(ch.value));
+}
+
+function updateBulkSelection() {
+    const selected = getSelectedOrderIds();
+    const counter = document.getElementById('bulk-selected-count');
+    const applyBtn = document.getElementById('bulk-apply');
+    if (counter) counter.textContent = selected.length;
+    if (applyBtn) applyBtn.disabled = selected.length === 0;
+}
+
+const selectAll = document.getElementById('select-all-orders');
+if (selectAll) {
+    selectAll.addEventListener('change', function() {
+        document.querySelectorAll('.order-select').forEach(ch => {
+            ch.checked = this.checked;
+        });
+        updateBulkSelection();
+    });
+}
+
+document.querySelectorAll('.order-select').forEach(ch => {
+    ch.addEventListener('change', updateBulkSelection);
+});
+
+async function bulkChangeStatus() {
+    const orderIds = getSelectedOrderIds();
+    const newStatus = document.getElementById('bulk-status').value;
+    if (!orderIds.length) return;
+
+    try {
+        const response = await fetch('/support/change_status', {
+            method: 'PATCH',
+            headers: { 'Content-Type': 'application/json' },
+            credentials: 'include',
+            body: JSON.stringify({ order_ids: orderIds, new_status: newStatus })
+        });
+
+        const data = await response.json();
+        if (!response.ok) {
+            alert(data.detail || 'Ошибка при обновлении статусов');
+            return;
+        }
+
+        const rejected = data.results.filter(r => !r.updated);
+        let message = `Статус изменён у заказов: ${data.updated} из ${data.results.length}`;
+        if (rejected.length) {
+            message += '\n\nНе изменены:\n' + rejected.map(r => `#${r.order_id}: ${r.detail}`).join('\n');
+        }
+        alert(message);
+        window.location.reload();
+    } catch (err) {
+        console.error('Ошибка:', err);
+        alert('Произошла ошибка при обновлении статусов');
+    }
+}
+
+function formatStatus(status) {
+    return status.replace(/_/g, ' ').replace(/(^|\s)\S/g, ch => ch.toUpperCase());
+}
+
+function patchOrderStatus(data) {
+    const row = document.querySelector(`tr[data-order-id="${data.order_id}"]`);
+    if (!row) return;
+    const badge = row.querySelector('[class^="status-"]');
+    if (!badge) return;
+    badge.className = `status-${data.status}`;
+    badge.textContent = formatStatus(data.status);
+    row.classList.add('row-updated');
+    setTimeout(() => row.classList.remove('row-updated'), 2000);
+}
+
+function insertOrderRow(data) {
+    const tbody = document.getElementById('orders-tbody');
+    if (!tbody || tbody.dataset.liveInsert !== 'true') return;
+    if (tbody.querySelector(`tr[data-order-id="${data.order_id}"]`)) return;
+
+    const empty = tbody.querySelector('.no-orders');
+    if (empty) empty.closest('tr').remove();
+
+    const row = document.createElement('tr');
+    row.className = 'clickable-row row-updated';
+    row.dataset.href = `support/order/${data.order_id}`;
+    row.dataset.orderId = data.order_id;
+
+    const selectCell = document.createElement('td');
+    selectCell.className = 'select-cell';
+    const checkbox = document.createElement('input');
+    checkbox.type = 'checkbox';
+    checkbox.className = 'order-select';
+    checkbox.value = data.order_id;
+    checkbox.addEventListener('change', updateBulkSelection);
+    selectCell.appendChild(checkbox);
+
+    const idCell = document.createElement('td');
+    const idStrong = document.createElement('strong');
+    idStrong.textContent = data.order_id;
+    idCell.appendChild(idStrong);
+
+    const userCell = document.createElement('td');
+    userCell.textContent = `(ID: ${data.user_id})`;
+
+    const dateCell = document.createElement('td');
+    dateCell.textContent = new Date(data.date).toLocaleDateString('ru-RU');
+
+    const statusCell = document.createElement('td');
+    const badge = document.createElement('span');
+    badge.className = `status-${data.status}`;
+    badge.textContent = formatStatus(data.status);
+    statusCell.appendChild(badge);
+
+    const sumCell = document.createElement('td');
+    sumCell.className = 'product-price';
+    sumCell.textContent = `${data.summa.toLocaleString('ru-RU').replace(/\u00a0/g, ' ')} ₽`;
+
+    row.append(selectCell, idCell, userCell, dateCell, statusCell, sumCell);
+    bindOrderRow(row);
+    tbody.prepend(row);
+    setTimeout(() => row.classList.remove('row-updated'), 2000);
+
+    const pageSize = Number(tbody.dataset.pageSize);
+    const rows = tbody.querySelectorAll('tr.clickable-row');
+    if (pageSize && rows.length > pageSize) {
+        rows[rows.length - 1].remove();
+    }
+}
+
+function connectOrdersFeed() {
+    if (!window.EventSource) return;
+    // EventSource сам переподключается при обрыве соединения
+    const source = new EventSource('/support/orders/events', { withCredentials: true });
+    source.addEventListener('order_created', e => insertOrderRow(JSON.parse(e.data)));
+    source.addEventListener('order_status_changed', e => patchOrderStatus(JSON.parse(e.data)));
+    source.addEventListener('resync', () => {
+        // брокер переподключал LISTEN, события за это время потеряны - перечитываем страницу;
+        // при выбранных заказах не сбрасываем выбор, страницу перезагрузит массовая смена статуса
+        if (!getSelectedOrderIds().length) window.location.reload();
+    });
+}
+
+connectOrdersFeed();
@@ -24,6 +24,27 @@ class Config:
     timedelta_token = timedelta(minutes=5)
     timedelta_refresh_token = timedelta(days=7)
     token_auto_refresh_threshold = 1
+    timedelta_idempotency_key = timedelta(hours=24)
+    idempotency_sweep_interval = 600  # секунды
+    idempotency_sweep_batch = 1000
+    export_chunk_rows = 1000
+    chat_agent_role = 'seller'  # роль, между пользователями которой распределяются новые чаты
+    agent_roster_ttl = 60  # секунды, кэш ростера перечитывается и без событий (ручная смена available)
+    agent_roster_candidates = 5  # наименее загруженных операторов из кэша, между которыми идет назначение
+    chat_window_size = 50  # сообщений на странице чата, более старые подгружаются курсором
+    sse_heartbeat_interval = 15  # секунды
+    broker_queue_size = 100  # событий в очереди одного подписчика, дальше подписчик отключается
+    broker_reconnect_delay = 1  # секунды, удваивается до broker_max_reconnect_delay
+    broker_max_reconnect_delay = 30
+    broker_healthcheck_interval = 30
+    notify_message_max_bytes = 4000  # длинный текст сообщения не кладем в NOTIFY (лимит 8000 байт)
+    sales_rollup_interval = 300  # секунды
+    sales_rollup_overlap = timedelta(minutes=10)  # запас на транзакции, закоммиченные позже своего now()
+    sales_rollup_days_batch = 31
+    chat_archive_after = timedelta(days=90)  # закрытые дольше этого чаты переносятся в архивные таблицы
+    chat_archive_interval = 3600  # секунды
+    chat_archive_batch = 200  # чатов в одной транзакции переноса
+    chat_archive_max_batches = 50  # пачек за один прогон планировщика
 
 
 class Statuses:
@@ -34,6 +55,16 @@ class Statuses:
     COMPLETED = 'Завершен'
     CANCELLED = 'Отменен'
 
+    # компактное хранение статуса в orders.status (smallint)
+    codes = {
+        DESIGNED: 1,
+        ON_ASSEMBLY: 2,
+        SENT: 3,
+        DELIVERED: 4,
+        COMPLETED: 5,
+        CANCELLED: 6
+    }
+
     changing_statuses = {
         # new ----------> old
         'ON_ASSEMBLY': 'Оформлен',
@@ -0,0 +1,87 @@
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.crud.decorators import handle_db_errors
+from general_functions.broker import notify, ROSTER_EVENTS_CHANNEL
+from models import SupportAgents
+
+
+@handle_db_errors
+async def get_agent_loads(db: AsyncSession):
+    result = await db.execute(
+        select(SupportAgents.user_id, SupportAgents.active_chats).where(SupportAgents.available.is_(True))
+    )
+    return dict(result.all())
+
+
+@handle_db_errors
+async def add_agent(db: AsyncSession,
+                    user_id: int
+):
+    # без commit: вызывается в транзакции создания пользователя
+    await db.execute(insert(SupportAgents).values(user_id=user_id).on_conflict_do_nothing())
+    await notify(db, ROSTER_EVENTS_CHANNEL, [{'event': 'agent_added', 'user_id': user_id}])
+
+
+@handle_db_errors
+async def remove_agent(db: AsyncSession,
+                       user_id: int
+):
+    # без commit: вызывается в транзакции удаления пользователя
+    removed = await db.scalar(delete(SupportAgents).where(SupportAgents.user_id == user_id)
+                              .returning(SupportAgents.user_id))
+    if removed is not None:
+        await notify(db, ROSTER_EVENTS_CHANNEL, [{'event': 'agent_removed', 'user_id': user_id}])
+
+
+@handle_db_errors
+async def assign_agent(db: AsyncSession,
+                       candidate_ids: list = None
+):
+    # наименее загруженный оператор по индексу ix_support_agents_load; строки, которые сейчас
+    # назначают параллельные запросы, пропускаются, блокировка держится до commit чата
+    query = (
+        select(SupportAgents.user_id)
+        .where(SupportAgents.available.is_(True))
+        .order_by(SupportAgents.active_chats, SupportAgents.user_id)
+        .limit(1)
+    )
+    agent_id = None
+    if candidate_ids:
+        # сначала среди кандидатов из кэша ростера, нагрузка сверяется по строкам таблицы
+        agent_id = await db.scalar(
+            query.where(SupportAgents.user_id.in_(candidate_ids)).with_for_update(skip_locked=True)
+        )
+    if agent_id is None:
+        agent_id = await db.scalar(query.with_for_update(skip_locked=True))
+    if agent_id is None:
+        # все свободные операторы заняты параллельными назначениями - ждем освобождения
+        agent_id = await db.scalar(query.with_for_update())
+    if agent_id is None:
+        return None
+
+    active_chats = await db.scalar(
+        update(SupportAgents)
+        .where(SupportAgents.user_id == agent_id)
+        .values(active_chats=SupportAgents.active_chats + 1)
+        .returning(SupportAgents.active_chats)
+    )
+    await notify(db, ROSTER_EVENTS_CHANNEL, [{'event': 'agent_load', 'user_id': agent_id,
+                                              'active_chats': active_chats}])
+    return agent_id
+
+
+@handle_db_errors
+async def release_agent(db: AsyncSession,
+                        user_id: int
+):
+    active_chats = await db.scalar(
+        update(SupportAgents)
+        .where(SupportAgents.user_id == user_id)
+        .values(active_chats=func.greatest(SupportAgents.active_chats - 1, 0))
+        .returning(SupportAgents.active_chats)
+    )
+    if active_chats is not None:
+        await notify(db, ROSTER_EVENTS_CHANNEL, [{'event': 'agent_load', 'user_id': user_id,
+                                                  'active_chats': active_chats}])
@@ -0,0 +1,81 @@
+from datetime import datetime
+
+from sqlalchemy import select, insert, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+
+from database.crud.decorators import handle_db_errors
+from models import Chats, Messages, ChatsArchive, MessagesArchive
+
+# колонки архива, заполняемые из горячих таблиц (archived_at проставляется сервером)
+CHAT_ARCHIVE_COLUMNS = [column.name for column in ChatsArchive.__table__.columns if column.name != 'archived_at']
+MESSAGE_ARCHIVE_COLUMNS = [column.name for column in MessagesArchive.__table__.columns]
+
+
+@handle_db_errors
+async def archive_closed_chats(db: AsyncSession,
+                               closed_before: datetime,
+                               limit: int
+):
+    # без commit: пачка переносится одной транзакцией вызывающего кода
+    chat_ids = (await db.execute(
+        select(Chats.id)
+        .where(Chats.active.is_(False), Chats.closed_at < closed_before)
+        .order_by(Chats.closed_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )).scalars().all()
+    if not chat_ids:
+        return 0
+
+    chats = Chats.__table__.c
+    messages = Messages.__table__.c
+    await db.execute(
+        insert(ChatsArchive).from_select(
+            CHAT_ARCHIVE_COLUMNS,
+            select(*[chats[name] for name in CHAT_ARCHIVE_COLUMNS]).where(chats.id.in_(chat_ids))
+        )
+    )
+    await db.execute(
+        insert(MessagesArchive).from_select(
+            MESSAGE_ARCHIVE_COLUMNS,
+            select(*[messages[name] for name in MESSAGE_ARCHIVE_COLUMNS]).where(messages.chat_id.in_(chat_ids))
+        )
+    )
+
+    # chats.last_message_id ссылается на messages - сначала снимаем ссылку
+    await db.execute(update(Chats).where(Chats.id.in_(chat_ids)).values(last_message_id=None))
+    await db.execute(delete(Messages).where(Messages.chat_id.in_(chat_ids)))
+    await db.execute(delete(Chats).where(Chats.id.in_(chat_ids)))
+    return len(chat_ids)
+
+
+@handle_db_errors
+async def get_archived_chats(db: AsyncSession,
+                             user_id: int = None,
+                             employee_id: int = None,
+                             limit: int = None,
+                             offset: int = None,
+                             sort_desc: bool = True
+):
+    query = select(ChatsArchive).options(joinedload(ChatsArchive.last_message))
+
+    if user_id:
+        query = query.where(ChatsArchive.user_id == user_id)
+
+    if employee_id:
+        query = query.where(ChatsArchive.employee_id == employee_id)
+
+    if sort_desc:
+        query = query.order_by(ChatsArchive.created_at.desc())
+    else:
+        query = query.order_by(ChatsArchive.created_at.asc())
+
+    if limit:
+        query = query.limit(limit)
+
+    if offset:
+        query = query.offset(offset)
+
+    result = await db.execute(query)
+    return result.scalars().all()
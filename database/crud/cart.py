@@ -99,6 +99,7 @@ async def delete_from_cart(db: AsyncSession,
                            user_id: int,
                            product_id: int = None,
                            clear_cart: bool = False,
+                           commit: bool = True
 ):
     if clear_cart:
         await db.execute(delete(Cart).where(Cart.user_id == user_id))
@@ -114,5 +115,7 @@ async def delete_from_cart(db: AsyncSession,
                 detail='NOT FOUND'
             )
         await db.delete(cart_item)
-    await db.commit()
+
+    if commit:
+        await db.commit()
 
@@ -1,9 +1,23 @@
+from datetime import date, datetime, time, timedelta, timezone
+
 from fastapi import HTTPException
-from sqlalchemy import select, update
+from sqlalchemy import select, update, func, union_all, literal_column, cast, null, true, false, Integer, BigInteger
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
+from database.crud.agents import assign_agent, release_agent
 from database.crud.decorators import handle_db_errors
-from models import Chats
+from general_functions.pagination_func import apply_keyset, encode_cursor
+from models import Chats, Messages, ChatsArchive, MessagesArchive
+
+FTS_CONFIG = literal_column("'russian'")
+SEARCH_HEADLINE_OPTIONS = 'StartSel=«, StopSel=», MaxFragments=2, MaxWords=25, MinWords=8'
+
+
+def fts_document(column):
+    # выражение совпадает с GIN-индексами ix_*_fts; конфигурация и '' подставляются литералами,
+    # иначе с параметрами подготовленного запроса планировщик не сопоставит его с индексом
+    return func.to_tsvector(FTS_CONFIG, func.coalesce(column, literal_column("''")))
 
 
 @handle_db_errors
@@ -15,10 +29,15 @@ async def get_chat(db: AsyncSession,
                    limit: int = None,
                    offset: int = None,
                    sort_asc: bool = False,
-                   sort_desc: bool = False
+                   sort_desc: bool = False,
+                   with_last_message: bool = False,
+                   include_archived: bool = False
 ):
     query = select(Chats)
 
+    if with_last_message:
+        query = query.options(joinedload(Chats.last_message))
+
     if chat_id:
         query = query.where(Chats.id == chat_id)
 
@@ -45,6 +64,9 @@ async def get_chat(db: AsyncSession,
 
     if chat_id or limit == 1:
         result = await db.scalar(query)
+        if result is None and chat_id and include_archived:
+            # закрытый чат мог быть перенесен архиватором
+            result = await db.scalar(select(ChatsArchive).where(ChatsArchive.id == chat_id))
 
     else:
         chats = await db.execute(query)
@@ -57,20 +79,36 @@ async def get_chat(db: AsyncSession,
 async def update_chat_status(db: AsyncSession,
                              chat_id: int
 ):
-    query = update(Chats).where(Chats.id == chat_id).values(active=False)
-    result = await db.execute(query)
+    query = (
+        update(Chats)
+        .where(Chats.id == chat_id, Chats.active.is_(True))
+        .values(active=False, closed_at=func.now())
+        .returning(Chats.employee_id)
+    )
+    employee_id = await db.scalar(query)
 
-    if result.rowcount == 0:
-        raise HTTPException(status_code=404, detail="Chat not found")
+    if employee_id is None:
+        # чат уже закрыт - счетчик оператора не трогаем
+        if await db.scalar(select(Chats.id).where(Chats.id == chat_id)) is None:
+            raise HTTPException(status_code=404, detail="Chat not found")
+        return
+
+    await release_agent(db=db, user_id=employee_id)
     await db.commit()
 
 
 @handle_db_errors
 async def create_chat(db: AsyncSession,
                       user_id: int,
-                      employee_id: int,
                       topic: str,
+                      employee_id: int = None,
+                      candidate_ids: list = None
 ):
+    if employee_id is None:
+        employee_id = await assign_agent(db=db, candidate_ids=candidate_ids)
+        if employee_id is None:
+            raise HTTPException(status_code=503, detail="Нет доступных операторов")
+
     chat_item = Chats(
         user_id=user_id,
         employee_id=employee_id,
@@ -79,3 +117,154 @@ async def create_chat(db: AsyncSession,
     db.add(chat_item)
     await db.commit()
 
+
+@handle_db_errors
+async def mark_chat_read(db: AsyncSession,
+                         chat_id: int,
+                         as_employee: bool = False,
+                         message_id: int = None
+):
+    # строка чата блокируется, чтобы параллельный create_message не потерял свой инкремент
+    chat = await db.scalar(
+        select(Chats)
+        .where(Chats.id == chat_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    if not chat:
+        raise HTTPException(status_code=404, detail="Chat not found")
+
+    prefix = 'employee' if as_employee else 'user'
+    last_read_id = getattr(chat, f'{prefix}_last_read_id')
+    unread = getattr(chat, f'{prefix}_unread')
+
+    if message_id is None or chat.last_message_id is None or message_id >= chat.last_message_id:
+        # обычный случай - прочитано все, без подсчета сообщений
+        message_id, unread = chat.last_message_id, 0
+    elif last_read_id is None or message_id > last_read_id:
+        reader_id = chat.employee_id if as_employee else chat.user_id
+        unread = await db.scalar(
+            select(func.count(Messages.id))
+            .where(Messages.chat_id == chat_id, Messages.id > message_id, Messages.sender_id != reader_id)
+        )
+    else:
+        # отметка прочтения только сдвигается вперед
+        await db.commit()
+        return unread
+
+    setattr(chat, f'{prefix}_last_read_id', message_id)
+    setattr(chat, f'{prefix}_unread', unread)
+    await db.commit()
+    return unread
+
+
+@handle_db_errors
+async def get_unread_counts(db: AsyncSession,
+                            user_id: int = None,
+                            employee_id: int = None
+):
+    # частичные индексы ix_chats_*_unread содержат только чаты с непрочитанными
+    if employee_id:
+        query = select(Chats.id, Chats.employee_unread).where(Chats.employee_id == employee_id,
+                                                              Chats.employee_unread > 0)
+    else:
+        query = select(Chats.id, Chats.user_unread).where(Chats.user_id == user_id, Chats.user_unread > 0)
+
+    result = await db.execute(query)
+    return dict(result.all())
+
+
+def build_chat_search_query(query: str,
+                            employee_id: int = None,
+                            user_id: int = None,
+                            date_from: date = None,
+                            date_to: date = None,
+                            cursor: str = None,
+                            limit: int = 20
+):
+    ts_query = func.websearch_to_tsquery(FTS_CONFIG, query)
+
+    def apply_filters(stmt, chat_model, created_col):
+        if employee_id:
+            stmt = stmt.where(chat_model.employee_id == employee_id)
+        if user_id:
+            stmt = stmt.where(chat_model.user_id == user_id)
+        if date_from:
+            stmt = stmt.where(created_col >= datetime.combine(date_from, time.min, tzinfo=timezone.utc))
+        if date_to:
+            stmt = stmt.where(created_col < datetime.combine(date_to + timedelta(days=1), time.min,
+                                                             tzinfo=timezone.utc))
+        return stmt
+
+    # совпадения в сообщениях и в темах чатов, живых и архивных; hit_id уникален в объединении:
+    # четный - id сообщения, нечетный - id чата, по нему же идет курсор вместе с created_at;
+    # считается в bigint, чтобы удвоенный id не переполнил integer
+    branches = []
+    for chat_model, message_model, archived in ((Chats, Messages, False), (ChatsArchive, MessagesArchive, True)):
+        message_hits = (
+            select(
+                (cast(message_model.id, BigInteger) * 2).label('hit_id'),
+                message_model.chat_id.label('chat_id'),
+                message_model.id.label('message_id'),
+                message_model.created_at.label('created_at'),
+                message_model.message.label('content'),
+                chat_model.topic.label('topic'),
+                chat_model.user_id.label('user_id'),
+                chat_model.employee_id.label('employee_id'),
+                (true() if archived else false()).label('archived')
+            )
+            .join(chat_model, chat_model.id == message_model.chat_id)
+            .where(fts_document(message_model.message).op('@@')(ts_query))
+        )
+        branches.append(apply_filters(message_hits, chat_model, message_model.created_at))
+
+        topic_hits = (
+            select(
+                (cast(chat_model.id, BigInteger) * 2 + 1).label('hit_id'),
+                chat_model.id.label('chat_id'),
+                cast(null(), Integer).label('message_id'),
+                chat_model.created_at.label('created_at'),
+                chat_model.topic.label('content'),
+                chat_model.topic.label('topic'),
+                chat_model.user_id.label('user_id'),
+                chat_model.employee_id.label('employee_id'),
+                (true() if archived else false()).label('archived')
+            )
+            .where(fts_document(chat_model.topic).op('@@')(ts_query))
+        )
+        branches.append(apply_filters(topic_hits, chat_model, chat_model.created_at))
+
+    hits = union_all(*branches).subquery('hits')
+    page = apply_keyset(select(hits), hits.c.created_at, hits.c.hit_id, cursor=cursor, sort_desc=True)
+    page = page.limit(limit + 1).subquery('page')
+
+    # ts_headline дорогой - считаем его только для строк текущей страницы
+    return (
+        select(
+            page,
+            func.ts_headline(FTS_CONFIG, func.coalesce(page.c.content, ''), ts_query,
+                             SEARCH_HEADLINE_OPTIONS).label('snippet')
+        )
+        .order_by(page.c.created_at.desc(), page.c.hit_id.desc())
+    )
+
+
+@handle_db_errors
+async def search_chats(db: AsyncSession,
+                       query: str,
+                       employee_id: int = None,
+                       user_id: int = None,
+                       date_from: date = None,
+                       date_to: date = None,
+                       cursor: str = None,
+                       limit: int = 20
+):
+    statement = build_chat_search_query(query=query, employee_id=employee_id, user_id=user_id,
+                                        date_from=date_from, date_to=date_to, cursor=cursor, limit=limit)
+    result = await db.execute(statement)
+    rows = result.all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1].created_at, rows[-1].hit_id) if rows and has_more else None
+    return rows, next_cursor
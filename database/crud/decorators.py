@@ -10,6 +10,9 @@ def handle_db_errors(func):
     async def wrapper(db: AsyncSession, *args, **kwargs):
         try:
             return await func(db, *args, **kwargs)
+        except HTTPException:
+            await db.rollback()
+            raise
         except SQLAlchemyError as e:
             await db.rollback()
             raise HTTPException(
@@ -37,6 +40,10 @@ def handler_base_errors(func):
         try:
             return await func(*args, **kwargs)
 
+        except HTTPException:
+            if db is not None:
+                await db.rollback()
+            raise
         except Exception as e:
             if db is not None:
                 await db.rollback()
@@ -0,0 +1,98 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import Config
+from database.crud.decorators import handle_db_errors
+from models import IdempotencyKeys
+
+
+@handle_db_errors
+async def get_idempotency_key(db: AsyncSession,
+                              key: str,
+                              user_id: int,
+                              endpoint: str
+):
+    query = (
+        select(IdempotencyKeys)
+        .where(IdempotencyKeys.key == key)
+        .where(IdempotencyKeys.user_id == user_id)
+        .where(IdempotencyKeys.endpoint == endpoint)
+        .where(IdempotencyKeys.expires_at > func.now())
+        .where(IdempotencyKeys.response.isnot(None))
+    )
+    return await db.scalar(query)
+
+
+@handle_db_errors
+async def claim_idempotency_key(db: AsyncSession,
+                                key: str,
+                                user_id: int,
+                                endpoint: str,
+                                request_hash: str = None,
+                                commit: bool = False
+):
+    # параллельный запрос с тем же ключом ждет на уникальном индексе, пока первый не завершится.
+    # Просроченный, но еще не удаленный ключ занимается заново
+    query = insert(IdempotencyKeys).values(
+        key=key,
+        user_id=user_id,
+        endpoint=endpoint,
+        request_hash=request_hash,
+        expires_at=datetime.now(timezone.utc) + Config.timedelta_idempotency_key
+    )
+    query = (
+        query.on_conflict_do_update(
+            index_elements=['user_id', 'endpoint', 'key'],
+            set_={'expires_at': query.excluded.expires_at,
+                  'request_hash': query.excluded.request_hash,
+                  'created_at': func.now(),
+                  'status_code': None,
+                  'response': None},
+            where=IdempotencyKeys.expires_at <= func.now()
+        )
+        .returning(IdempotencyKeys.id)
+    )
+    key_id = await db.scalar(query)
+
+    if commit:
+        await db.commit()
+    return key_id
+
+
+@handle_db_errors
+async def save_idempotent_response(db: AsyncSession,
+                                   key_id: int,
+                                   status_code: int,
+                                   response: dict,
+                                   commit: bool = False
+):
+    query = (
+        update(IdempotencyKeys)
+        .where(IdempotencyKeys.id == key_id)
+        .values(status_code=status_code, response=response)
+    )
+    await db.execute(query)
+
+    if commit:
+        await db.commit()
+
+
+@handle_db_errors
+async def delete_expired_idempotency_keys(db: AsyncSession,
+                                          batch_size: int = 1000
+):
+    expired_ids = (
+        select(IdempotencyKeys.id)
+        .where(IdempotencyKeys.expires_at <= func.now())
+        .order_by(IdempotencyKeys.expires_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(
+        delete(IdempotencyKeys).where(IdempotencyKeys.id.in_(expired_ids))
+    )
+    await db.commit()
+    return result.rowcount
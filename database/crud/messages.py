@@ -1,15 +1,19 @@
-from sqlalchemy import select
+from sqlalchemy import select, update, or_, case
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from models import Messages
+from config import Config
+from general_functions.pagination_func import apply_keyset, encode_cursor
+from models import Messages, Chats, User, MessagesArchive
 from database.crud.decorators import handle_db_errors
+from general_functions.broker import notify, CHAT_EVENTS_CHANNEL
 
 
 @handle_db_errors
 async def create_message(db: AsyncSession,
                          sender_id: int,
                          chat_id: int,
-                         message: str
+                         message: str,
+                         commit: bool = True
 ):
     message_item = Messages(
         chat_id=chat_id,
@@ -17,7 +21,38 @@ async def create_message(db: AsyncSession,
         sender_id=sender_id
     )
     db.add(message_item)
-    await db.commit()
+    await db.flush()
+
+    newer = or_(Chats.last_message_at.is_(None), Chats.last_message_at <= message_item.created_at)
+    from_user = Chats.user_id == sender_id
+    await db.execute(
+        update(Chats)
+        .where(Chats.id == chat_id)
+        .values(
+            last_message_id=case((newer, message_item.id), else_=Chats.last_message_id),
+            last_message_at=case((newer, message_item.created_at), else_=Chats.last_message_at),
+            # у второго участника растет счетчик непрочитанных, отправитель прочитал чат до своего сообщения
+            user_unread=case((from_user, 0), else_=Chats.user_unread + 1),
+            user_last_read_id=case((from_user, message_item.id), else_=Chats.user_last_read_id),
+            employee_unread=case((from_user, Chats.employee_unread + 1), else_=0),
+            employee_last_read_id=case((from_user, Chats.employee_last_read_id), else_=message_item.id)
+        )
+    )
+
+    event = {
+        'event': 'message_created',
+        'id': message_item.id,
+        'chat_id': message_item.chat_id,
+        'sender_id': message_item.sender_id,
+        'created_at': message_item.created_at.isoformat()
+    }
+    if len(message.encode()) <= Config.notify_message_max_bytes:
+        event['message'] = message
+    await notify(db, CHAT_EVENTS_CHANNEL, [event])
+
+    if commit:
+        await db.commit()
+    return message_item
 
 
 @handle_db_errors
@@ -55,3 +90,25 @@ async def get_message(db: AsyncSession,
     return result
 
 
+@handle_db_errors
+async def get_messages_page(db: AsyncSession,
+                            chat_id: int,
+                            before: str = None,
+                            limit: int = 15,
+                            archived: bool = False
+):
+    # страница истории от новых к старым; before - курсор (created_at, id) самого старого загруженного сообщения
+    model = MessagesArchive if archived else Messages
+    query = (
+        select(model, User.username.label('sender_name'))
+        .outerjoin(User, model.sender_id == User.id)
+        .where(model.chat_id == chat_id)
+    )
+    query = apply_keyset(query, model.created_at, model.id, cursor=before, sort_desc=True)
+    rows = (await db.execute(query.limit(limit + 1))).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1][0].created_at, rows[-1][0].id) if rows and has_more else None
+
+    return [(row[0], row[1]) for row in rows], next_cursor
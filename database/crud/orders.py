@@ -1,10 +1,12 @@
 from fastapi import HTTPException, status
-from sqlalchemy import select, update, func
+from sqlalchemy import select, update, func, text, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from config import Statuses
 from database.crud.decorators import handle_db_errors
-from models import Orders
+from general_functions.broker import notify, ORDER_EVENTS_CHANNEL
+from general_functions.pagination_func import apply_keyset
+from models import Orders, OrderItems
 
 
 @handle_db_errors
@@ -12,16 +14,35 @@ async def create_new_order(db: AsyncSession,
                            user_id: int,
                            products: dict,
                            summa: int,
-
+                           commit: bool = True
 ):
     order = Orders(
         user_id=user_id,
         products=products,
-        summa=summa
+        summa=summa,
+        items=[
+            OrderItems(product_id=int(product_id),
+                       price=product_data['price'],
+                       count=product_data['count'],
+                       name=product_data.get('name'),
+                       image_url=product_data.get('image_url'))
+            for product_id, product_data in products.items()
+        ]
     )
     db.add(order)
     await db.flush()
-    await db.commit()
+
+    await notify(db, ORDER_EVENTS_CHANNEL, [{
+        'event': 'order_created',
+        'order_id': order.id,
+        'user_id': order.user_id,
+        'status': order.status,
+        'summa': order.summa,
+        'date': order.date.isoformat()
+    }])
+
+    if commit:
+        await db.commit()
 
     return order
 
@@ -78,7 +99,8 @@ async def get_orders(
     offset: int = None,
     sort_asc: bool = False,
     sort_desc: bool = False,
-    func_count: bool = False
+    func_count: bool = False,
+    cursor: str = None
 ):
     if func_count:
         query = select(func.count()).select_from(Orders)
@@ -95,10 +117,8 @@ async def get_orders(
     if user_id:
         query = query.where(Orders.user_id == user_id)
 
-    if sort_asc:
-        query = query.order_by(Orders.date.asc())
-    if sort_desc:
-        query = query.order_by(Orders.date.desc())
+    if sort_asc or sort_desc:
+        query = apply_keyset(query, Orders.date, Orders.id, cursor=cursor, sort_desc=sort_desc)
     if limit:
         query = query.limit(limit)
     if offset:
@@ -112,44 +132,153 @@ async def get_orders(
         return result.scalars().all()
 
 
+def get_status_transition(new_status: str):
+    allowed_previous_status = Statuses.changing_statuses.get(new_status)
+    new_status_text = getattr(Statuses, new_status, None)
+
+    if allowed_previous_status is None or new_status_text is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Недопустимый новый статус'
+        )
+    return allowed_previous_status, new_status_text
+
+
 @handle_db_errors
 async def update_status(db: AsyncSession,
                         order_id: int,
-                        new_status: str
+                        new_status: str,
+                        user_id: int = None,
+                        commit: bool = True
 ):
-    order = await get_orders(order_id=order_id, db=db)
+    allowed_previous_status, new_status_text = get_status_transition(new_status)
+
+    query = (
+        update(Orders)
+        .where(Orders.id == order_id)
+        .where(Orders.status == allowed_previous_status)
+        .values(status=new_status_text)
+        .returning(Orders.id, Orders.user_id, Orders.status)
+    )
+    if user_id:
+        query = query.where(Orders.user_id == user_id)
 
-    if not order:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f'Заказ с ID {order_id} не найден'
-        )
+    updated = (await db.execute(query)).first()
 
-    allowed_previous_status = Statuses.changing_statuses.get(new_status)
-    if allowed_previous_status is None:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail='Недопустимый новый статус'
-        )
+    if updated is None:
+        current = (await db.execute(
+            select(Orders.user_id, Orders.status).where(Orders.id == order_id)
+        )).first()
 
-    if allowed_previous_status != order.status:
+        if current is None or (user_id and current.user_id != user_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f'Заказ с ID {order_id} не найден'
+            )
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f'Недопустимый переход статуса. Текущий статус: "{order.status}"'
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f'Недопустимый переход статуса. Текущий статус: "{current.status}"'
         )
 
-    new_status_text = getattr(Statuses, new_status, None)
-    if new_status_text is None:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail='Недопустимый новый статус'
+    await notify(db, ORDER_EVENTS_CHANNEL, [{
+        'event': 'order_status_changed',
+        'order_id': updated.id,
+        'user_id': updated.user_id,
+        'status': updated.status
+    }])
+
+    if commit:
+        await db.commit()
+    return dict(updated._mapping)
+
+
+@handle_db_errors
+async def update_statuses(db: AsyncSession,
+                          order_ids: list,
+                          new_status: str,
+                          commit: bool = True
+):
+    allowed_previous_status, new_status_text = get_status_transition(new_status)
+    order_ids = sorted(set(order_ids))
+
+    query = (
+        update(Orders)
+        .where(Orders.id.in_(order_ids))
+        .where(Orders.status == allowed_previous_status)
+        .values(status=new_status_text)
+        .returning(Orders.id, Orders.user_id)
+    )
+    updated = (await db.execute(query)).all()
+    updated_ids = {row.id for row in updated}
+
+    await notify(db, ORDER_EVENTS_CHANNEL, [
+        {'event': 'order_status_changed', 'order_id': row.id, 'user_id': row.user_id, 'status': new_status_text}
+        for row in updated
+    ])
+
+    results = {order_id: {'updated': True, 'status': new_status_text} for order_id in updated_ids}
+
+    rejected_ids = [order_id for order_id in order_ids if order_id not in updated_ids]
+    if rejected_ids:
+        current = await db.execute(
+            select(Orders.id, Orders.status).where(Orders.id.in_(rejected_ids))
         )
+        current_statuses = dict(current.all())
+        for order_id in rejected_ids:
+            if order_id in current_statuses:
+                results[order_id] = {
+                    'updated': False,
+                    'status': current_statuses[order_id],
+                    'detail': f'Недопустимый переход статуса. Текущий статус: "{current_statuses[order_id]}"'
+                }
+            else:
+                results[order_id] = {
+                    'updated': False,
+                    'status': None,
+                    'detail': f'Заказ с ID {order_id} не найден'
+                }
+
+    if commit:
+        await db.commit()
+    return results
 
-    query = update(Orders).where(Orders.id == order_id).values(status=new_status_text)
-    await db.execute(query)
-    await db.commit()
 
+@handle_db_errors
+async def search_order_ids(db: AsyncSession,
+                           query: str = None,
+                           limit: int = 20
+):
+    # префикс номера заказа раскладывается в диапазоны id, чтобы искать по первичному ключу
+    stmt = select(Orders.id)
+
+    if query:
+        query = query.strip()
+        if not query.isdigit():
+            return []
+
+        prefix = int(query)
+        max_id = await db.scalar(select(func.max(Orders.id)))
+        if not max_id or prefix > max_id:
+            return []
 
+        ranges = []
+        low, high = prefix, prefix
+        while low <= max_id:
+            ranges.append(Orders.id.between(low, high))
+            low, high = low * 10, high * 10 + 9
+            if low == 0:
+                break
+        stmt = stmt.where(or_(*ranges))
 
+    stmt = stmt.order_by(Orders.id.desc()).limit(limit)
+    result = await db.execute(stmt)
+    return result.scalars().all()
 
 
+@handle_db_errors
+async def get_orders_count_estimate(db: AsyncSession):
+    # оценка планировщика вместо COUNT(*) по всей таблице
+    estimate = await db.scalar(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = 'orders'::regclass")
+    )
+    return max(estimate or 0, 0)
@@ -0,0 +1,200 @@
+from datetime import timedelta
+
+from sqlalchemy import select, delete, func, cast, or_, and_, literal, distinct, Date
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.crud.decorators import handle_db_errors
+from models import (Orders, OrderItems, Product, Category, SalesDaily, SalesDailyCategory, SalesDailyProduct,
+                    SalesRollupState)
+
+ORDER_DAY = cast(Orders.date, Date)
+
+
+def _orders_in_days(days: list):
+    # диапазоны по orders.date вместо date(orders.date) IN (...), чтобы работал индекс по дате
+    return or_(*[
+        and_(Orders.date >= literal(day, Date), Orders.date < literal(day + timedelta(days=1), Date))
+        for day in days
+    ])
+
+
+@handle_db_errors
+async def get_changed_sales_days(db: AsyncSession, since=None):
+    query = select(distinct(ORDER_DAY))
+    if since is not None:
+        query = query.where(Orders.updated_at > since)
+    result = await db.execute(query)
+    return sorted(result.scalars().all())
+
+
+@handle_db_errors
+async def refresh_sales_days(db: AsyncSession, days: list):
+    # дни пересчитываются целиком: повторный пересчет того же дня дает тот же результат
+    if not days:
+        return
+
+    for model in (SalesDaily, SalesDailyCategory, SalesDailyProduct):
+        await db.execute(delete(model).where(model.day.in_(days)))
+
+    in_days = _orders_in_days(days)
+
+    products = (
+        select(ORDER_DAY.label('day'),
+               Orders.status,
+               OrderItems.product_id,
+               func.sum(OrderItems.price * OrderItems.count),
+               func.count(distinct(Orders.id)),
+               func.sum(OrderItems.count))
+        .join(OrderItems, OrderItems.order_id == Orders.id)
+        .where(in_days)
+        .group_by(ORDER_DAY, Orders.status, OrderItems.product_id)
+    )
+    await db.execute(insert(SalesDailyProduct).from_select(
+        ['day', 'status', 'product_id', 'revenue', 'orders_count', 'units'], products
+    ))
+
+    category_id = func.coalesce(Product.category_id, 0)
+    categories = (
+        select(ORDER_DAY.label('day'),
+               Orders.status,
+               category_id,
+               func.sum(OrderItems.price * OrderItems.count),
+               func.count(distinct(Orders.id)),
+               func.sum(OrderItems.count))
+        .join(OrderItems, OrderItems.order_id == Orders.id)
+        .outerjoin(Product, Product.id == OrderItems.product_id)
+        .where(in_days)
+        .group_by(ORDER_DAY, Orders.status, category_id)
+    )
+    await db.execute(insert(SalesDailyCategory).from_select(
+        ['day', 'status', 'category_id', 'revenue', 'orders_count', 'units'], categories
+    ))
+
+    units = (
+        select(SalesDailyProduct.day,
+               SalesDailyProduct.status,
+               func.sum(SalesDailyProduct.units).label('units'))
+        .where(SalesDailyProduct.day.in_(days))
+        .group_by(SalesDailyProduct.day, SalesDailyProduct.status)
+        .subquery()
+    )
+    totals = (
+        select(ORDER_DAY.label('day'),
+               Orders.status.label('status'),
+               func.sum(Orders.summa).label('revenue'),
+               func.count().label('orders_count'))
+        .where(in_days)
+        .group_by(ORDER_DAY, Orders.status)
+        .subquery()
+    )
+    daily = (
+        select(totals.c.day,
+               totals.c.status,
+               totals.c.revenue,
+               totals.c.orders_count,
+               func.coalesce(units.c.units, 0))
+        .outerjoin(units, and_(units.c.day == totals.c.day, units.c.status == totals.c.status))
+    )
+    await db.execute(insert(SalesDaily).from_select(
+        ['day', 'status', 'revenue', 'orders_count', 'units'], daily
+    ))
+
+
+@handle_db_errors
+async def clear_sales_rollups(db: AsyncSession):
+    for model in (SalesDaily, SalesDailyCategory, SalesDailyProduct):
+        await db.execute(delete(model))
+
+
+@handle_db_errors
+async def get_sales_rollup_state(db: AsyncSession, name: str):
+    return await db.scalar(select(SalesRollupState.last_run_at).where(SalesRollupState.name == name))
+
+
+@handle_db_errors
+async def set_sales_rollup_state(db: AsyncSession, name: str, last_run_at):
+    query = (
+        insert(SalesRollupState)
+        .values(name=name, last_run_at=last_run_at)
+        .on_conflict_do_update(index_elements=[SalesRollupState.name], set_={'last_run_at': last_run_at})
+    )
+    await db.execute(query)
+
+
+@handle_db_errors
+async def get_sales_by_day(db: AsyncSession, date_from, date_to, statuses: list = None):
+    query = (
+        select(SalesDaily.day,
+               func.sum(SalesDaily.revenue).label('revenue'),
+               func.sum(SalesDaily.orders_count).label('orders_count'),
+               func.sum(SalesDaily.units).label('units'))
+        .where(SalesDaily.day.between(date_from, date_to))
+        .group_by(SalesDaily.day)
+        .order_by(SalesDaily.day)
+    )
+    if statuses:
+        query = query.where(SalesDaily.status.in_(statuses))
+    return (await db.execute(query)).all()
+
+
+@handle_db_errors
+async def get_sales_by_status(db: AsyncSession, date_from, date_to):
+    query = (
+        select(SalesDaily.status,
+               func.sum(SalesDaily.revenue).label('revenue'),
+               func.sum(SalesDaily.orders_count).label('orders_count'),
+               func.sum(SalesDaily.units).label('units'))
+        .where(SalesDaily.day.between(date_from, date_to))
+        .group_by(SalesDaily.status)
+        .order_by(SalesDaily.status)
+    )
+    return (await db.execute(query)).all()
+
+
+@handle_db_errors
+async def get_sales_by_category(db: AsyncSession, date_from, date_to, statuses: list = None, limit: int = 10):
+    rollup = (
+        select(SalesDailyCategory.category_id,
+               func.sum(SalesDailyCategory.revenue).label('revenue'),
+               func.sum(SalesDailyCategory.orders_count).label('orders_count'),
+               func.sum(SalesDailyCategory.units).label('units'))
+        .where(SalesDailyCategory.day.between(date_from, date_to))
+        .group_by(SalesDailyCategory.category_id)
+        .order_by(func.sum(SalesDailyCategory.revenue).desc())
+        .limit(limit)
+    )
+    if statuses:
+        rollup = rollup.where(SalesDailyCategory.status.in_(statuses))
+    rollup = rollup.subquery()
+
+    query = (
+        select(rollup, Category.name)
+        .outerjoin(Category, Category.id == rollup.c.category_id)
+        .order_by(rollup.c.revenue.desc())
+    )
+    return (await db.execute(query)).all()
+
+
+@handle_db_errors
+async def get_sales_by_product(db: AsyncSession, date_from, date_to, statuses: list = None, limit: int = 10):
+    rollup = (
+        select(SalesDailyProduct.product_id,
+               func.sum(SalesDailyProduct.revenue).label('revenue'),
+               func.sum(SalesDailyProduct.orders_count).label('orders_count'),
+               func.sum(SalesDailyProduct.units).label('units'))
+        .where(SalesDailyProduct.day.between(date_from, date_to))
+        .group_by(SalesDailyProduct.product_id)
+        .order_by(func.sum(SalesDailyProduct.revenue).desc())
+        .limit(limit)
+    )
+    if statuses:
+        rollup = rollup.where(SalesDailyProduct.status.in_(statuses))
+    rollup = rollup.subquery()
+
+    query = (
+        select(rollup, Product.name)
+        .outerjoin(Product, Product.id == rollup.c.product_id)
+        .order_by(rollup.c.revenue.desc())
+    )
+    return (await db.execute(query)).all()
@@ -1,10 +1,12 @@
 from fastapi import HTTPException, status
 from httpx import delete
-from sqlalchemy import select, update, insert
+from sqlalchemy import select, update, insert, or_, func, exists
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from config import Config
+from database.crud.agents import add_agent, remove_agent
 from database.crud.decorators import handle_db_errors
-from models import User
+from models import User, Orders
 
 
 @handle_db_errors
@@ -24,9 +26,12 @@ async def create_user(db: AsyncSession,
         hashed_password=hashed_password,
         role=role
     ).returning(User))
+    created_user = result.scalar_one()
+
+    if role == Config.chat_agent_role:
+        await add_agent(db=db, user_id=created_user.id)
 
     await db.commit()
-    created_user = result.scalar_one()
     return created_user
 
 
@@ -86,7 +91,40 @@ async def delete_user_from_db(db: AsyncSession,
                               user_id: int
 ):
     user = await get_user(db=db, user_id=user_id)
+    if user.role == Config.chat_agent_role:
+        await remove_agent(db=db, user_id=user_id)
     await db.delete(user)
     await db.commit()
 
 
+@handle_db_errors
+async def search_users(db: AsyncSession,
+                       query: str = None,
+                       user_ids: list = None,
+                       with_orders: bool = False,
+                       limit: int = 20
+):
+    stmt = select(User)
+
+    if user_ids:
+        stmt = stmt.where(User.id.in_(user_ids))
+
+    if query:
+        query = query.strip().lower()
+        if query.isdigit():
+            stmt = stmt.where(User.id == int(query))
+        else:
+            # префиксный поиск по индексам lower(...) text_pattern_ops
+            pattern = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            stmt = stmt.where(or_(
+                func.lower(User.username).like(pattern),
+                func.lower(User.first_name).like(pattern),
+                func.lower(User.last_name).like(pattern)
+            ))
+
+    if with_orders:
+        stmt = stmt.where(exists().where(Orders.user_id == User.id))
+
+    stmt = stmt.order_by(User.id).limit(limit)
+    result = await db.execute(stmt)
+    return result.scalars().all()
@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.log.log import LOGGER
+from config import Config
+from database.crud.agents import get_agent_loads
+from general_functions.broker import broker, SubscriptionOverflow, ROSTER_EVENTS_CHANNEL
+
+
+class AgentRoster:
+    # кэш свободных операторов и их нагрузки в памяти процесса: назначение и освобождение обновляют
+    # счетчик по событию канала agent_roster, добавление и удаление оператора сбрасывают кэш;
+    # изменения в обход приложения (ручная смена available) подхватываются по истечении ttl
+    def __init__(self, ttl: float = Config.agent_roster_ttl):
+        self.ttl = ttl
+        self._loads = None
+        self._loaded_at = 0.0
+        self._version = 0
+
+    def invalidate(self):
+        self._loads = None
+        self._version += 1
+
+    def apply(self, event: dict):
+        self._version += 1
+        if event.get('event') != 'agent_load':
+            self.invalidate()
+        elif self._loads is not None and event.get('user_id') in self._loads:
+            self._loads[event['user_id']] = event['active_chats']
+
+    async def get(self, db: AsyncSession) -> dict:
+        if self._loads is None or time.monotonic() - self._loaded_at > self.ttl:
+            version = self._version
+            loads = await get_agent_loads(db=db)
+            # событие, пришедшее во время загрузки, делает прочитанный снимок устаревшим
+            if version == self._version:
+                self._loads = loads
+                self._loaded_at = time.monotonic()
+            return dict(loads)
+        return dict(self._loads)
+
+    async def candidates(self, db: AsyncSession, limit: int = Config.agent_roster_candidates) -> list:
+        loads = await self.get(db=db)
+        return sorted(loads, key=lambda user_id: (loads[user_id], user_id))[:limit]
+
+
+agent_roster = AgentRoster()
+
+
+async def agent_roster_watcher():
+    while True:
+        try:
+            async with broker.subscribe(ROSTER_EVENTS_CHANNEL) as subscription:
+                # изменения до подписки могли быть пропущены
+                agent_roster.invalidate()
+                while True:
+                    agent_roster.apply(await subscription.get())
+        except asyncio.CancelledError:
+            raise
+        except SubscriptionOverflow:
+            continue
+        except Exception as e:
+            LOGGER.error(f"Ошибка при отслеживании ростера операторов: {e}")
+            await asyncio.sleep(1)
@@ -0,0 +1,61 @@
+import asyncio
+import sys
+from datetime import datetime, timezone
+
+from sqlalchemy import select, func
+
+from app.log.log import LOGGER
+from config import Config
+from database.crud.archive import archive_closed_chats
+from database.db import async_session_maker, engine
+
+CHAT_ARCHIVE_LOCK = 4_241_002  # ключ advisory lock: архиватор работает только в одном процессе
+
+
+async def archive_chats(max_batches: int = Config.chat_archive_max_batches) -> int:
+    # каждая пачка - отдельная транзакция, чтобы не держать блокировки на весь прогон
+    closed_before = datetime.now(timezone.utc) - Config.chat_archive_after
+    archived = 0
+    for _ in range(max_batches):
+        async with async_session_maker() as db:
+            try:
+                if not await db.scalar(select(func.pg_try_advisory_xact_lock(CHAT_ARCHIVE_LOCK))):
+                    return archived
+                moved = await archive_closed_chats(db=db, closed_before=closed_before,
+                                                   limit=Config.chat_archive_batch)
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+        archived += moved
+        if moved < Config.chat_archive_batch:
+            break
+    return archived
+
+
+async def chat_archive_scheduler(interval: int = Config.chat_archive_interval):
+    while True:
+        try:
+            archived = await archive_chats()
+            if archived:
+                LOGGER.info(f"Перенесено в архив закрытых чатов: {archived}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            LOGGER.error(f"Ошибка при архивации чатов: {e}")
+        await asyncio.sleep(interval)
+
+
+async def archive_all_chats() -> int:
+    try:
+        return await archive_chats(max_batches=sys.maxsize)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    # перенос всего накопившегося без ограничения числа пачек: python -m general_functions.archive_func run
+    if sys.argv[1:] != ['run']:
+        sys.exit('Использование: python -m general_functions.archive_func run')
+    chats_count = asyncio.run(archive_all_chats())
+    print(f"Перенесено в архив закрытых чатов: {chats_count}")
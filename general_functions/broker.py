@@ -0,0 +1,221 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager, suppress
+
+import asyncpg
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.log.log import LOGGER
+from config import Config
+
+ORDER_EVENTS_CHANNEL = 'order_events'
+CHAT_EVENTS_CHANNEL = 'chat_events'
+ROSTER_EVENTS_CHANNEL = 'agent_roster'
+
+
+class SubscriptionOverflow(Exception):
+    """Подписчик не успевал разбирать очередь и был отключен."""
+
+
+async def notify(db: AsyncSession, channel: str, payloads: list):
+    # pg_notify внутри транзакции доставляется только после commit, при rollback событие пропадает
+    if not payloads:
+        return
+    await db.execute(
+        text('SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload'),
+        {
+            'channel': channel,
+            'payloads': [json.dumps(payload, ensure_ascii=False, default=str) for payload in payloads]
+        }
+    )
+
+
+class Subscription:
+    def __init__(self, maxsize: int):
+        self._queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def put(self, event: dict) -> bool:
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            self._overflow()
+            return False
+
+    def _overflow(self):
+        # очередь очищается, чтобы разбудить читателя: get() сразу бросит SubscriptionOverflow
+        self.overflowed = True
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(None)
+
+    async def get(self) -> dict:
+        if self.overflowed:
+            raise SubscriptionOverflow()
+        event = await self._queue.get()
+        if event is None:
+            raise SubscriptionOverflow()
+        return event
+
+
+class EventBroker:
+    # одно LISTEN-соединение на процесс на все каналы; каждый воркер uvicorn получает все NOTIFY сам
+    def __init__(self,
+                 dsn: str = None,
+                 queue_size: int = Config.broker_queue_size,
+                 reconnect_delay: float = Config.broker_reconnect_delay,
+                 max_reconnect_delay: float = Config.broker_max_reconnect_delay,
+                 healthcheck_interval: float = Config.broker_healthcheck_interval
+    ):
+        self.dsn = dsn
+        self.queue_size = queue_size
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.healthcheck_interval = healthcheck_interval
+        self._channels = {}  # канал -> поле события с ключом подписки (user_id, chat_id)
+        self._subscribers = {}  # (канал, ключ) -> подписки, ключ None - все события канала
+        self._connection = None
+        self._lost = None
+        self._supervisor = None
+
+    def register(self, channel: str, key_field: str = None):
+        self._channels[channel] = key_field
+
+    async def start(self):
+        self._lost = asyncio.Event()
+        await self._connect()
+        self._supervisor = asyncio.create_task(self._supervise())
+
+    async def stop(self):
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._supervisor
+            self._supervisor = None
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            with suppress(Exception):
+                await connection.close()
+
+    def _dsn(self) -> str:
+        if self.dsn:
+            return self.dsn
+        url = make_url(Config.SQLALCHEMY_DATABASE_URL).set(drivername='postgresql')
+        return url.render_as_string(hide_password=False)
+
+    async def _connect(self):
+        connection = await asyncpg.connect(self._dsn())
+        try:
+            for channel in self._channels:
+                await connection.add_listener(channel, self._dispatch)
+        except Exception:
+            await connection.close()
+            raise
+        connection.add_termination_listener(self._on_termination)
+        self._connection = connection
+
+    def _on_termination(self, connection):
+        if connection is self._connection:
+            self._lost.set()
+
+    async def _is_alive(self) -> bool:
+        try:
+            await asyncio.wait_for(self._connection.fetchval('SELECT 1'), timeout=self.healthcheck_interval)
+            return True
+        except (asyncio.TimeoutError, OSError, asyncpg.PostgresError, asyncpg.InterfaceError):
+            return False
+
+    async def _supervise(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._lost.wait(), timeout=self.healthcheck_interval)
+            except asyncio.TimeoutError:
+                # обрыв сети без закрытия сокета termination listener не заметит
+                if await self._is_alive():
+                    continue
+
+            self._lost.clear()
+            connection, self._connection = self._connection, None
+            if connection is not None:
+                connection.terminate()
+            LOGGER.error("Соединение LISTEN потеряно, переподключение")
+
+            delay = self.reconnect_delay
+            while True:
+                try:
+                    await self._connect()
+                    break
+                except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                    LOGGER.error(f"Не удалось переподключить LISTEN: {e}")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.max_reconnect_delay)
+
+            LOGGER.info("Соединение LISTEN восстановлено")
+            # события за время разрыва потеряны - подписчики должны перечитать состояние
+            for (channel, key), subscriptions in list(self._subscribers.items()):
+                for subscription in list(subscriptions):
+                    self._deliver(channel, key, subscription, {'event': 'resync'})
+
+    def _dispatch(self, connection, pid, channel, payload):
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            LOGGER.error(f"Некорректное событие в канале {channel}: {payload}")
+            return
+
+        keys = [None]
+        key_field = self._channels.get(channel)
+        if key_field and event.get(key_field) is not None:
+            keys.append(event[key_field])
+
+        for key in keys:
+            for subscription in list(self._subscribers.get((channel, key), ())):
+                self._deliver(channel, key, subscription, event)
+
+    def _deliver(self, channel: str, key, subscription: Subscription, event: dict):
+        if not subscription.put(event):
+            LOGGER.warning(f"Подписчик канала {channel} ({key}) не успевает читать события и отключен")
+            self._remove(channel, key, subscription)
+
+    def _remove(self, channel: str, key, subscription: Subscription):
+        subscriptions = self._subscribers.get((channel, key))
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscribers[(channel, key)]
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str, key=None):
+        subscription = Subscription(self.queue_size)
+        self._subscribers.setdefault((channel, key), set()).add(subscription)
+        try:
+            yield subscription
+        finally:
+            self._remove(channel, key, subscription)
+
+
+broker = EventBroker()
+broker.register(ORDER_EVENTS_CHANNEL, key_field='user_id')
+broker.register(CHAT_EVENTS_CHANNEL, key_field='chat_id')
+broker.register(ROSTER_EVENTS_CHANNEL)
+
+
+async def sse_stream(request,
+                     channel: str,
+                     key=None,
+                     heartbeat: int = Config.sse_heartbeat_interval
+):
+    async with broker.subscribe(channel, key) as subscription:
+        while not await request.is_disconnected():
+            try:
+                event = await asyncio.wait_for(subscription.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            except SubscriptionOverflow:
+                # поток закрывается, EventSource на клиенте переподключится сам
+                break
+            yield f"event: {event['event']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
@@ -0,0 +1,95 @@
+import asyncio
+from contextlib import suppress
+
+from fastapi import WebSocket, WebSocketDisconnect, status
+
+from app.log.log import LOGGER
+from database.crud.chats import get_chat
+from database.crud.messages import create_message
+from database.crud.users import get_user
+from database.db import async_session_maker
+from general_functions.broker import broker, Subscription, SubscriptionOverflow, CHAT_EVENTS_CHANNEL
+from models import Messages
+
+
+async def _participant_names(chat) -> dict:
+    async with async_session_maker() as db:
+        names = {}
+        for user_id in (chat.user_id, chat.employee_id):
+            user = await get_user(db=db, user_id=user_id)
+            if user:
+                names[user_id] = user.username
+        return names
+
+
+async def _push_chat_events(websocket: WebSocket, subscription: Subscription, names: dict):
+    while True:
+        try:
+            event = await subscription.get()
+        except SubscriptionOverflow:
+            # клиент не успевает читать - закрываем сокет, после переподключения он перечитает историю
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+            return
+
+        if event['event'] != 'message_created':
+            await websocket.send_json(event)
+            continue
+
+        event = dict(event)  # один и тот же объект события получают все подписчики
+        if 'message' not in event:
+            # текст не поместился в NOTIFY - берем из БД
+            async with async_session_maker() as db:
+                message = await db.get(Messages, event['id'])
+                event['message'] = message.message if message else ''
+        event['sender_name'] = names.get(event.get('sender_id'))
+        await websocket.send_json(event)
+
+
+async def run_chat_socket(websocket: WebSocket, chat, sender_id: int):
+    # входящие сообщения пишутся через create_message, рассылка идет из NOTIFY всем участникам чата
+    await websocket.accept()
+    names = await _participant_names(chat)
+
+    async with broker.subscribe(CHAT_EVENTS_CHANNEL, chat.id) as subscription:
+        receiver = asyncio.create_task(_receive_chat_messages(websocket, chat, sender_id))
+        pusher = asyncio.create_task(_push_chat_events(websocket, subscription, names))
+        try:
+            done, _ = await asyncio.wait({receiver, pusher}, return_when=asyncio.FIRST_COMPLETED)
+
+            if pusher in done and pusher.exception() is not None:
+                # рассылка упала - клиент больше не получит событий, держать сокет открытым нельзя
+                LOGGER.error(f"Ошибка рассылки событий чата {chat.id}: {pusher.exception()!r}")
+                with suppress(RuntimeError):
+                    await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+
+            if receiver in done:
+                error = receiver.exception()
+                # RuntimeError - сокет уже закрыт отправляющей стороной при переполнении очереди
+                if error is not None and not isinstance(error, (WebSocketDisconnect, RuntimeError)):
+                    raise error
+        finally:
+            for task in (receiver, pusher):
+                if not task.done():
+                    task.cancel()
+                    with suppress(asyncio.CancelledError):
+                        await task
+
+
+async def _receive_chat_messages(websocket: WebSocket, chat, sender_id: int):
+    while True:
+        try:
+            data = await websocket.receive_json()
+        except ValueError:
+            await websocket.send_json({'event': 'error', 'detail': 'Некорректный формат сообщения'})
+            continue
+
+        text = str(data.get('message') or '').strip() if isinstance(data, dict) else ''
+        if not text:
+            continue
+
+        async with async_session_maker() as db:
+            current = await get_chat(db=db, chat_id=chat.id)
+            if not current or not current.active:
+                await websocket.send_json({'event': 'error', 'detail': 'Чат неактивен'})
+                continue
+            await create_message(db=db, chat_id=chat.id, sender_id=sender_id, message=text)
@@ -0,0 +1,30 @@
+import asyncio
+
+from app.log.log import LOGGER
+from config import Config
+from database.crud.idempotency import delete_expired_idempotency_keys
+from database.db import async_session_maker
+
+
+async def purge_expired_idempotency_keys(batch_size: int = Config.idempotency_sweep_batch):
+    deleted_total = 0
+    async with async_session_maker() as db:
+        while True:
+            deleted = await delete_expired_idempotency_keys(db=db, batch_size=batch_size)
+            deleted_total += deleted
+            if deleted < batch_size:
+                break
+    return deleted_total
+
+
+async def idempotency_keys_sweeper(interval: int = Config.idempotency_sweep_interval):
+    while True:
+        try:
+            deleted = await purge_expired_idempotency_keys()
+            if deleted:
+                LOGGER.info(f"Удалено просроченных ключей идемпотентности: {deleted}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            LOGGER.error(f"Ошибка при очистке ключей идемпотентности: {e}")
+        await asyncio.sleep(interval)
@@ -1,33 +1,207 @@
+import hashlib
+import json
+
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from database.crud.orders import get_orders
+from database.crud.cart import delete_from_cart
+from database.crud.idempotency import claim_idempotency_key, save_idempotent_response
+from database.crud.orders import get_orders, create_new_order, update_status, update_statuses
+from database.crud.products import get_product
+from general_functions.pagination_func import encode_cursor
+from general_functions.product_func import reserve_stock, restore_stock
 
 
 async def fetch_orders_for_user(
     user_id: int,
-    page: int,
     per_page: int,
-    db: AsyncSession
+    db: AsyncSession,
+    cursor: str = None,
+    with_count: bool = False
 ):
-    total_count = await get_orders(func_count=True, user_id=user_id, db=db)
-    offset = (page - 1) * per_page
-    orders = await get_orders(
+    orders_with_extra = await get_orders(
         sort_desc=True,
         user_id=user_id,
-        offset=offset,
-        limit=per_page,
+        cursor=cursor,
+        limit=per_page + 1,
         db=db
     )
-    total_pages = (total_count + per_page - 1) // per_page
+    has_next = len(orders_with_extra) > per_page
+    orders = orders_with_extra[:per_page]
+
+    total_count = None
+    if with_count:
+        total_count = await get_orders(func_count=True, user_id=user_id, db=db)
 
     return {
         "orders": orders,
         "pagination": {
-            "page": page,
             "per_page": per_page,
+            "cursor": cursor,
+            "next_cursor": encode_cursor(orders[-1].date, orders[-1].id) if has_next else None,
             "total_count": total_count,
-            "total_pages": total_pages,
-            "has_next": page < total_pages,
-            "has_prev": page > 1
+            "has_next": has_next,
+            "has_prev": cursor is not None
         }
-    }
\ No newline at end of file
+    }
+
+
+def count_cart_items(cart_items: list) -> dict:
+    items = {}
+    for item in cart_items:
+        items[item['product_id']] = items.get(item['product_id'], 0) + item['count']
+    return items
+
+
+def order_request_hash(cart_items: list) -> str:
+    # тела у запроса нет - отпечатком служит состав корзины, из которой оформляется заказ
+    items = sorted(count_cart_items(cart_items).items())
+    return hashlib.sha256(json.dumps(items, separators=(',', ':')).encode()).hexdigest()
+
+
+def order_created_response(order):
+    return {'message': 'Заказ оформлен!',
+            'order_id': order.id,
+            'redirect_url': f'/orders/{order.id}'}
+
+
+async def place_order(user_id: int,
+                      cart_items: list,
+                      db: AsyncSession,
+                      idempotency_key: str = None,
+                      endpoint: str = 'orders.create'
+):
+    # списание остатков, заказ и очистка корзины - одна транзакция с одним коммитом.
+    # Возвращает None, если заказ с этим ключом идемпотентности уже оформил параллельный запрос
+    items = count_cart_items(cart_items)
+
+    try:
+        key_id = None
+        if idempotency_key:
+            key_id = await claim_idempotency_key(key=idempotency_key,
+                                                 user_id=user_id,
+                                                 endpoint=endpoint,
+                                                 request_hash=order_request_hash(cart_items),
+                                                 db=db)
+            if key_id is None:
+                await db.rollback()
+                return None
+
+        products = await reserve_stock(items=items, db=db)
+
+        products_data = {}
+        total_sum = 0
+
+        for product_id, count in items.items():
+            product = products[product_id]
+            price = product.price
+            products_data[product_id] = {
+                'price': price,
+                'count': count,
+                'name': product.name,
+                'image_url': product.image_urls[0] if product.image_urls else None
+            }
+            total_sum += price * count
+
+        order = await create_new_order(user_id=user_id,
+                                       products=products_data,
+                                       summa=total_sum,
+                                       commit=False,
+                                       db=db)
+
+        await delete_from_cart(user_id=user_id,
+                               clear_cart=True,
+                               commit=False,
+                               db=db)
+
+        if key_id is not None:
+            await save_idempotent_response(key_id=key_id,
+                                           status_code=201,
+                                           response=order_created_response(order),
+                                           db=db)
+        await db.commit()
+
+    except Exception:
+        await db.rollback()
+        raise
+
+    return order
+
+
+async def build_order_lines(order,
+                            db: AsyncSession
+):
+    # название и картинка берутся из снимка в заказе; товары ищутся только для старых заказов без снимка
+    legacy_ids = [int(product_id) for product_id, product_data in order.products.items()
+                  if 'name' not in product_data]
+    products = await get_product(db=db, product_ids=legacy_ids) if legacy_ids else []
+    products_by_id = {product.id: product for product in products}
+
+    order_products = []
+    total_amount = 0
+
+    for product_id, product_data in order.products.items():
+        item_total = product_data['count'] * product_data['price']
+
+        if 'name' in product_data:
+            name = product_data['name']
+            image_url = product_data.get('image_url')
+        else:
+            product = products_by_id.get(int(product_id))
+            name = product.name if product else f'Товар #{product_id} (удален)'
+            image_url = product.image_urls[0] if product and product.image_urls else None
+
+        order_products.append({
+            'id': int(product_id),
+            'name': name,
+            'price': product_data['price'],
+            'count': product_data['count'],
+            'image_url': image_url,
+            'item_total': item_total
+        })
+        total_amount += item_total
+
+    return order_products, total_amount
+
+
+async def cancel_order_with_restock(order_id: int,
+                                    db: AsyncSession,
+                                    user_id: int = None
+):
+    # смена статуса и возврат остатков - одна транзакция; из двух параллельных отмен проходит одна
+    try:
+        await update_status(order_id=order_id,
+                            new_status='CANCELLED',
+                            user_id=user_id,
+                            commit=False,
+                            db=db)
+
+        await restore_stock(order_ids=[order_id], db=db)
+        await db.commit()
+
+    except Exception:
+        await db.rollback()
+        raise
+
+
+async def change_orders_status(order_ids: list,
+                               new_status: str,
+                               db: AsyncSession
+):
+    # массовая смена статуса одним UPDATE; при отмене остатки возвращаются в той же транзакции
+    try:
+        results = await update_statuses(order_ids=order_ids,
+                                        new_status=new_status,
+                                        commit=False,
+                                        db=db)
+
+        if new_status == 'CANCELLED':
+            cancelled_ids = [order_id for order_id, result in results.items() if result['updated']]
+            await restore_stock(order_ids=cancelled_ids, db=db)
+
+        await db.commit()
+
+    except Exception:
+        await db.rollback()
+        raise
+
+    return results
@@ -0,0 +1,50 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from fastapi import HTTPException, status
+from sqlalchemy import tuple_
+
+
+def encode_cursor(value, row_id: int) -> str:
+    if isinstance(value, datetime):
+        value = {'dt': value.isoformat()}
+    payload = json.dumps([value, row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if isinstance(value, dict):
+            value = datetime.fromisoformat(value['dt'])
+        return value, int(row_id)
+    except (ValueError, TypeError, KeyError, binascii.Error):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Некорректный курсор пагинации'
+        )
+
+
+def apply_keyset(stmt,
+                 sort_col,
+                 id_col,
+                 cursor: str = None,
+                 sort_desc: bool = True,
+                 backward: bool = False
+):
+    # keyset-пагинация по (sort_col, id): при движении назад порядок временно переворачивается
+    descending = sort_desc != backward
+
+    if cursor:
+        value, row_id = decode_cursor(cursor)
+        if descending:
+            stmt = stmt.where(tuple_(sort_col, id_col) < (value, row_id))
+        else:
+            stmt = stmt.where(tuple_(sort_col, id_col) > (value, row_id))
+
+    if descending:
+        return stmt.order_by(sort_col.desc(), id_col.desc())
+    return stmt.order_by(sort_col.asc(), id_col.asc())
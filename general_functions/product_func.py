@@ -1,8 +1,8 @@
 from fastapi import Depends
-from sqlalchemy import select, update
+from sqlalchemy import select, update, values, column, Integer, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from models import Product
+from models import Product, OrderItems
 from database.db_depends import get_db
 
 
@@ -41,3 +41,78 @@ async def update_stock(product_id: int,
     await db.commit()
     return {'message': 'Количество товара на складе обновлено'}
 
+
+async def reserve_stock(items: dict,
+                        db: AsyncSession = Depends(get_db)):
+    # items: {product_id: count}. Коммит делает вызывающая сторона
+    product_ids = sorted(items)
+
+    # блокируем строки в порядке id, чтобы параллельные заказы не ловили deadlock
+    locked = await db.execute(
+        select(Product)
+        .where(Product.id.in_(product_ids))
+        .order_by(Product.id)
+        .with_for_update()
+    )
+    products = {product.id: product for product in locked.scalars().all()}
+
+    lines = values(
+        column('product_id', Integer),
+        column('count', Integer),
+        name='lines'
+    ).data([(product_id, items[product_id]) for product_id in product_ids])
+
+    update_query = (
+        update(Product)
+        .where(Product.id == lines.c.product_id)
+        .where(Product.stock >= lines.c.count)
+        .values(stock=Product.stock - lines.c.count)
+        .returning(Product.id)
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(update_query)
+    updated_ids = set(result.scalars().all())
+
+    if len(updated_ids) != len(product_ids):
+        missing = [product_id for product_id in product_ids if product_id not in updated_ids]
+        details = ', '.join(
+            f'"{products[product_id].name}" (доступно {products[product_id].stock or 0} ед.)'
+            if product_id in products else f'ID {product_id} (не найден)'
+            for product_id in missing
+        )
+        raise ValueError(f'Недостаточно товара на складе: {details}')
+
+    return products
+
+
+async def restore_stock(order_ids: list,
+                        db: AsyncSession = Depends(get_db)):
+    # возврат всех позиций заказов на склад одним UPDATE, коммит делает вызывающая сторона
+    if not order_ids:
+        return 0
+
+    order_product_ids = select(OrderItems.product_id).where(OrderItems.order_id.in_(order_ids))
+
+    await db.execute(
+        select(Product.id)
+        .where(Product.id.in_(order_product_ids))
+        .order_by(Product.id)
+        .with_for_update()
+    )
+
+    # один товар может встречаться в нескольких заказах - суммируем до UPDATE
+    returned = (
+        select(OrderItems.product_id, func.sum(OrderItems.count).label('count'))
+        .where(OrderItems.order_id.in_(order_ids))
+        .group_by(OrderItems.product_id)
+        .subquery('returned')
+    )
+
+    update_query = (
+        update(Product)
+        .where(Product.id == returned.c.product_id)
+        .values(stock=Product.stock + returned.c.count)
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(update_query)
+    return result.rowcount
@@ -1,7 +1,9 @@
 from config import Config
+from database.crud.archive import get_archived_chats
 from general_functions.orders_func import fetch_orders_for_user
-from models import Chats, Messages
+from models import Chats
 from sqlalchemy import select
+from sqlalchemy.orm import joinedload
 
 
 async def get_tab_by_section(section, templates, request, user, page, db, user_dict):
@@ -24,36 +26,35 @@ async def get_tab_by_section(section, templates, request, user, page, db, user_d
     }
 
     if section == 'orders_tab':
-        orders_data = await fetch_orders_for_user(user_id=user_dict['id'], page=page, per_page=5, db=db)
+        orders_data = await fetch_orders_for_user(user_id=user_dict['id'], per_page=5, db=db)
         return_dict.update({'orders_data': orders_data})
 
     elif section == 'chats_tab':
+        # закрытые чаты архиватор переносит в chats_archive, покупатель видит их отдельным списком
+        archived = request.query_params.get('archived') == '1'
+        return_dict.update({'archived': archived})
         try:
             limit = 10
             offset = (page - 1) * limit
 
-            query = (
-                select(Chats)
-                .where(Chats.user_id == user.id)
-                .order_by(Chats.created_at.desc())
-                .offset(offset)
-                .limit(limit + 1)
-            )
-            result = await db.execute(query)
-            chats_with_extra = result.scalars().all()
+            if archived:
+                chats_with_extra = await get_archived_chats(user_id=user.id, offset=offset, limit=(limit + 1),
+                                                            db=db)
+            else:
+                query = (
+                    select(Chats)
+                    .options(joinedload(Chats.last_message))
+                    .where(Chats.user_id == user.id)
+                    .order_by(Chats.created_at.desc())
+                    .offset(offset)
+                    .limit(limit + 1)
+                )
+                result = await db.execute(query)
+                chats_with_extra = result.scalars().all()
 
             has_more = len(chats_with_extra) > limit
             chats = chats_with_extra[:limit]
 
-            for chat in chats:
-                last_msg_query = (
-                    select(Messages)
-                    .where(Messages.chat_id == chat.id)
-                    .order_by(Messages.created_at.desc())
-                    .limit(1)
-                )
-                chat.last_message = await db.scalar(last_msg_query)
-
             return_dict.update({
                 'chats': chats,
                 'page': page,
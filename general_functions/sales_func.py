@@ -0,0 +1,72 @@
+import asyncio
+import sys
+
+from sqlalchemy import select, func
+
+from app.log.log import LOGGER
+from config import Config
+from database.crud.sales import (get_changed_sales_days, refresh_sales_days, clear_sales_rollups,
+                                 get_sales_rollup_state, set_sales_rollup_state)
+from database.db import async_session_maker, engine
+
+SALES_ROLLUP_NAME = 'sales'
+SALES_ROLLUP_LOCK = 4_241_001  # ключ advisory lock: пересчет идет только в одном процессе
+
+
+async def _refresh_in_batches(db, days: list, batch: int = Config.sales_rollup_days_batch):
+    for start in range(0, len(days), batch):
+        await refresh_sales_days(db=db, days=days[start:start + batch])
+
+
+async def update_sales_rollups(full: bool = False) -> int:
+    async with async_session_maker() as db:
+        try:
+            if full:
+                await db.execute(select(func.pg_advisory_xact_lock(SALES_ROLLUP_LOCK)))
+            elif not await db.scalar(select(func.pg_try_advisory_xact_lock(SALES_ROLLUP_LOCK))):
+                return 0
+
+            started_at = await db.scalar(select(func.now()))
+            last_run_at = None if full else await get_sales_rollup_state(db=db, name=SALES_ROLLUP_NAME)
+
+            if last_run_at is None:
+                await clear_sales_rollups(db=db)
+                days = await get_changed_sales_days(db=db)
+            else:
+                days = await get_changed_sales_days(db=db, since=last_run_at - Config.sales_rollup_overlap)
+
+            await _refresh_in_batches(db, days)
+            await set_sales_rollup_state(db=db, name=SALES_ROLLUP_NAME, last_run_at=started_at)
+            await db.commit()
+            return len(days)
+        except Exception:
+            await db.rollback()
+            raise
+
+
+async def sales_rollup_scheduler(interval: int = Config.sales_rollup_interval):
+    while True:
+        try:
+            refreshed = await update_sales_rollups()
+            if refreshed:
+                LOGGER.info(f"Витрины продаж пересчитаны за дней: {refreshed}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            LOGGER.error(f"Ошибка при пересчете витрин продаж: {e}")
+        await asyncio.sleep(interval)
+
+
+async def rebuild_sales_rollups() -> int:
+    try:
+        return await update_sales_rollups(full=True)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    # полный пересчет: python -m general_functions.sales_func rebuild
+    if sys.argv[1:] != ['rebuild']:
+        sys.exit('Использование: python -m general_functions.sales_func rebuild')
+    days_count = asyncio.run(rebuild_sales_rollups())
+    print(f"Витрины продаж пересобраны, дней: {days_count}")
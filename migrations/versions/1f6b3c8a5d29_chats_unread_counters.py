@@ -0,0 +1,42 @@
+"""Chats unread counters
+
+Revision ID: 1f6b3c8a5d29
+Revises: 6a2d9e4f1b37
+Create Date: 2026-10-19 19:31:08.514227
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1f6b3c8a5d29'
+down_revision: Union[str, None] = '6a2d9e4f1b37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('chats', sa.Column('user_last_read_id', sa.Integer(), nullable=True))
+    op.add_column('chats', sa.Column('user_unread', sa.Integer(), server_default=sa.text('0'), nullable=False))
+    op.add_column('chats', sa.Column('employee_last_read_id', sa.Integer(), nullable=True))
+    op.add_column('chats', sa.Column('employee_unread', sa.Integer(), server_default=sa.text('0'), nullable=False))
+    # существующая история считается прочитанной обоими участниками
+    op.execute('UPDATE chats SET user_last_read_id = last_message_id, employee_last_read_id = last_message_id')
+    op.create_index('ix_chats_user_unread', 'chats', ['user_id'], unique=False,
+                    postgresql_where=sa.text('user_unread > 0'))
+    op.create_index('ix_chats_employee_unread', 'chats', ['employee_id'], unique=False,
+                    postgresql_where=sa.text('employee_unread > 0'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_chats_employee_unread', table_name='chats', postgresql_where=sa.text('employee_unread > 0'))
+    op.drop_index('ix_chats_user_unread', table_name='chats', postgresql_where=sa.text('user_unread > 0'))
+    op.drop_column('chats', 'employee_unread')
+    op.drop_column('chats', 'employee_last_read_id')
+    op.drop_column('chats', 'user_unread')
+    op.drop_column('chats', 'user_last_read_id')
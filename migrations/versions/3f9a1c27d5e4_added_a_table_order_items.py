@@ -0,0 +1,53 @@
+"""Added a table order_items
+
+Revision ID: 3f9a1c27d5e4
+Revises: c468bda49966
+Create Date: 2026-10-19 11:02:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a1c27d5e4'
+down_revision: Union[str, None] = 'c468bda49966'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('order_items',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('price', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('order_id', 'product_id', name='_order_product_uc')
+    )
+    op.create_index(op.f('ix_order_items_id'), 'order_items', ['id'], unique=False)
+    op.create_index('ix_order_items_product_id_order_id', 'order_items', ['product_id', 'order_id'], unique=False)
+
+    # переносим строки заказов из JSON orders.products
+    op.execute("""
+        INSERT INTO order_items (order_id, product_id, price, count)
+        SELECT o.id,
+               line.key::integer,
+               (line.value ->> 'price')::integer,
+               (line.value ->> 'count')::integer
+        FROM orders AS o
+        CROSS JOIN LATERAL json_each(o.products) AS line
+        ON CONFLICT (order_id, product_id) DO NOTHING
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_order_items_product_id_order_id', table_name='order_items')
+    op.drop_index(op.f('ix_order_items_id'), table_name='order_items')
+    op.drop_table('order_items')
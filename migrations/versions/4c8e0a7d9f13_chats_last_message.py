@@ -0,0 +1,45 @@
+"""Chats last message
+
+Revision ID: 4c8e0a7d9f13
+Revises: 9b3d6f1e2a74
+Create Date: 2026-10-19 18:02:17.640381
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c8e0a7d9f13'
+down_revision: Union[str, None] = '9b3d6f1e2a74'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('chats', sa.Column('last_message_id', sa.Integer(), nullable=True))
+    op.add_column('chats', sa.Column('last_message_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_foreign_key('fk_chats_last_message_id', 'chats', 'messages', ['last_message_id'], ['id'],
+                          ondelete='SET NULL')
+
+    op.execute("""
+        UPDATE chats
+        SET last_message_id = last.id,
+            last_message_at = last.created_at
+        FROM (
+            SELECT DISTINCT ON (chat_id) chat_id, id, created_at
+            FROM messages
+            ORDER BY chat_id, created_at DESC, id DESC
+        ) AS last
+        WHERE last.chat_id = chats.id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('fk_chats_last_message_id', 'chats', type_='foreignkey')
+    op.drop_column('chats', 'last_message_at')
+    op.drop_column('chats', 'last_message_id')
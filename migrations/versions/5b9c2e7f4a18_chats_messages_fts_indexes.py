@@ -0,0 +1,38 @@
+"""Chats and messages full-text search indexes
+
+Revision ID: 5b9c2e7f4a18
+Revises: 8e4a1d7c3b52
+Create Date: 2026-10-19 20:37:12.660489
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b9c2e7f4a18'
+down_revision: Union[str, None] = '8e4a1d7c3b52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FTS_INDEXES = (
+    ('ix_messages_message_fts', 'messages', 'message'),
+    ('ix_chats_topic_fts', 'chats', 'topic'),
+    ('ix_messages_archive_message_fts', 'messages_archive', 'message'),
+    ('ix_chats_archive_topic_fts', 'chats_archive', 'topic'),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for index_name, table_name, column_name in FTS_INDEXES:
+        op.create_index(index_name, table_name, [sa.text(f"to_tsvector('russian', coalesce({column_name}, ''))")],
+                        unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for index_name, table_name, _ in reversed(FTS_INDEXES):
+        op.drop_index(index_name, table_name=table_name, postgresql_using='gin')
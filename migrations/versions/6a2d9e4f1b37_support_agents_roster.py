@@ -0,0 +1,46 @@
+"""Support agents roster
+
+Revision ID: 6a2d9e4f1b37
+Revises: d71f5c2b8e06
+Create Date: 2026-10-19 19:05:41.372915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a2d9e4f1b37'
+down_revision: Union[str, None] = 'd71f5c2b8e06'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('support_agents',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('active_chats', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('available', sa.Boolean(), server_default=sa.text('true'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_index('ix_support_agents_load', 'support_agents', ['active_chats', 'user_id'], unique=False,
+                    postgresql_where=sa.text('available'))
+    # ростер заполняется текущими операторами с их открытыми чатами
+    op.execute("""
+        INSERT INTO support_agents (user_id, active_chats)
+        SELECT u.id, count(c.id)
+        FROM users u
+        LEFT JOIN chats c ON c.employee_id = u.id AND c.active
+        WHERE u.role = 'seller'
+        GROUP BY u.id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_support_agents_load', table_name='support_agents', postgresql_where=sa.text('available'))
+    op.drop_table('support_agents')
@@ -0,0 +1,65 @@
+"""Added product snapshot to orders
+
+Revision ID: 8d2e4b61a0c3
+Revises: 3f9a1c27d5e4
+Create Date: 2026-10-19 12:27:05.904611
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2e4b61a0c3'
+down_revision: Union[str, None] = '3f9a1c27d5e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('order_items', sa.Column('name', sa.String(), nullable=True))
+    op.add_column('order_items', sa.Column('image_url', sa.String(), nullable=True))
+
+    # снимок для уже оформленных заказов берется из текущих товаров
+    op.execute("""
+        UPDATE order_items AS oi
+        SET name = p.name,
+            image_url = p.image_urls ->> 0
+        FROM products AS p
+        WHERE p.id = oi.product_id
+    """)
+    op.execute("""
+        UPDATE orders AS o
+        SET products = (
+            SELECT json_object_agg(
+                line.key,
+                CASE
+                    WHEN p.id IS NULL THEN line.value::jsonb
+                    ELSE line.value::jsonb || jsonb_build_object('name', p.name,
+                                                                 'image_url', p.image_urls ->> 0)
+                END
+            )
+            FROM json_each(o.products) AS line
+            LEFT JOIN products AS p ON p.id = line.key::integer
+        )
+        WHERE json_typeof(o.products) = 'object'
+          AND EXISTS (SELECT 1 FROM json_each(o.products))
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("""
+        UPDATE orders AS o
+        SET products = (
+            SELECT json_object_agg(line.key, (line.value::jsonb - 'name') - 'image_url')
+            FROM json_each(o.products) AS line
+        )
+        WHERE json_typeof(o.products) = 'object'
+          AND EXISTS (SELECT 1 FROM json_each(o.products))
+    """)
+    op.drop_column('order_items', 'image_url')
+    op.drop_column('order_items', 'name')
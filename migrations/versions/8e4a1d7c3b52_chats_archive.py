@@ -0,0 +1,69 @@
+"""Chats archive
+
+Revision ID: 8e4a1d7c3b52
+Revises: 1f6b3c8a5d29
+Create Date: 2026-10-19 20:02:46.905173
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e4a1d7c3b52'
+down_revision: Union[str, None] = '1f6b3c8a5d29'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('chats', sa.Column('closed_at', sa.DateTime(timezone=True), nullable=True))
+    # для уже закрытых чатов время закрытия неизвестно - берем последнюю активность
+    op.execute('UPDATE chats SET closed_at = coalesce(last_message_at, created_at) WHERE NOT active')
+    op.create_index('ix_chats_closed_at', 'chats', ['closed_at'], unique=False,
+                    postgresql_where=sa.text('NOT active'))
+
+    op.create_table('chats_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('employee_id', sa.Integer(), nullable=False),
+    sa.Column('topic', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('active', sa.Boolean(), nullable=False),
+    sa.Column('closed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_message_id', sa.Integer(), nullable=True),
+    sa.Column('last_message_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('user_last_read_id', sa.Integer(), nullable=True),
+    sa.Column('user_unread', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('employee_last_read_id', sa.Integer(), nullable=True),
+    sa.Column('employee_unread', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_chats_archive_user_id', 'chats_archive', ['user_id', 'created_at'], unique=False)
+    op.create_index('ix_chats_archive_employee_id', 'chats_archive', ['employee_id', 'created_at'], unique=False)
+
+    op.create_table('messages_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('chat_id', sa.Integer(), nullable=False),
+    sa.Column('message', sa.String(), nullable=True),
+    sa.Column('sender_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_messages_archive_chat_id_created_at_id', 'messages_archive',
+                    ['chat_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_messages_archive_chat_id_created_at_id', table_name='messages_archive')
+    op.drop_table('messages_archive')
+    op.drop_index('ix_chats_archive_employee_id', table_name='chats_archive')
+    op.drop_index('ix_chats_archive_user_id', table_name='chats_archive')
+    op.drop_table('chats_archive')
+    op.drop_index('ix_chats_closed_at', table_name='chats', postgresql_where=sa.text('NOT active'))
+    op.drop_column('chats', 'closed_at')
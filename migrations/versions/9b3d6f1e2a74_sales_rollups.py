@@ -0,0 +1,67 @@
+"""Sales rollups
+
+Revision ID: 9b3d6f1e2a74
+Revises: e2f7a9c41d58
+Create Date: 2026-10-19 17:05:41.903216
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b3d6f1e2a74'
+down_revision: Union[str, None] = 'e2f7a9c41d58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('orders', sa.Column('updated_at', sa.DateTime(timezone=True),
+                                      server_default=sa.text('now()'), nullable=False))
+    op.create_index('ix_orders_updated_at', 'orders', ['updated_at'], unique=False)
+
+    op.create_table('sales_daily',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('status', sa.SmallInteger(), nullable=False),
+    sa.Column('revenue', sa.BigInteger(), nullable=False),
+    sa.Column('orders_count', sa.Integer(), nullable=False),
+    sa.Column('units', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'status')
+    )
+    op.create_table('sales_daily_category',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('status', sa.SmallInteger(), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.BigInteger(), nullable=False),
+    sa.Column('orders_count', sa.Integer(), nullable=False),
+    sa.Column('units', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'status', 'category_id')
+    )
+    op.create_table('sales_daily_product',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('status', sa.SmallInteger(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.BigInteger(), nullable=False),
+    sa.Column('orders_count', sa.Integer(), nullable=False),
+    sa.Column('units', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'status', 'product_id')
+    )
+    op.create_table('sales_rollup_state',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('last_run_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('sales_rollup_state')
+    op.drop_table('sales_daily_product')
+    op.drop_table('sales_daily_category')
+    op.drop_table('sales_daily')
+    op.drop_index('ix_orders_updated_at', table_name='orders')
+    op.drop_column('orders', 'updated_at')
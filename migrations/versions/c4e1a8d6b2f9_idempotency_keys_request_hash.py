@@ -0,0 +1,29 @@
+"""Idempotency keys request fingerprint
+
+Revision ID: c4e1a8d6b2f9
+Revises: 5b9c2e7f4a18
+Create Date: 2026-10-19 21:14:05.318842
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e1a8d6b2f9'
+down_revision: Union[str, None] = '5b9c2e7f4a18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # отпечаток запроса, под которым занят ключ; у старых ключей NULL - они повторяются без сверки
+    op.add_column('idempotency_keys', sa.Column('request_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('idempotency_keys', 'request_hash')
@@ -0,0 +1,71 @@
+"""Orders indexes and status codes
+
+Revision ID: c5b8e21d7f46
+Revises: a7c05e93f1b8
+Create Date: 2026-10-19 15:36:52.117483
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5b8e21d7f46'
+down_revision: Union[str, None] = 'a7c05e93f1b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # статус хранится как smallint: 1 Оформлен, 2 На сборке, 3 Отправлен, 4 Доставлен, 5 Завершен, 6 Отменен
+    op.alter_column('orders', 'status', server_default=None)
+    op.execute("""
+        ALTER TABLE orders
+        ALTER COLUMN status TYPE smallint
+        USING (CASE status
+                   WHEN 'Оформлен' THEN 1
+                   WHEN 'На сборке' THEN 2
+                   WHEN 'Отправлен' THEN 3
+                   WHEN 'Доставлен' THEN 4
+                   WHEN 'Завершен' THEN 5
+                   WHEN 'Отменен' THEN 6
+               END)
+    """)
+    op.alter_column('orders', 'status', server_default=sa.text('1'))
+    op.create_check_constraint('ck_orders_status', 'orders', 'status BETWEEN 1 AND 6')
+
+    op.create_index('ix_orders_date_id', 'orders', ['date', 'id'], unique=False)
+    op.create_index('ix_orders_user_id_date_id', 'orders', ['user_id', 'date', 'id'], unique=False)
+    op.create_index('ix_orders_status_date_id', 'orders', ['status', 'date', 'id'], unique=False)
+    op.create_index('ix_orders_summa_id', 'orders', ['summa', 'id'], unique=False)
+    op.create_index('ix_orders_designed_date_id', 'orders', ['date', 'id'], unique=False,
+                    postgresql_where=sa.text('status = 1'))
+    op.execute('ANALYZE orders')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_orders_designed_date_id', table_name='orders')
+    op.drop_index('ix_orders_summa_id', table_name='orders')
+    op.drop_index('ix_orders_status_date_id', table_name='orders')
+    op.drop_index('ix_orders_user_id_date_id', table_name='orders')
+    op.drop_index('ix_orders_date_id', table_name='orders')
+
+    op.drop_constraint('ck_orders_status', 'orders', type_='check')
+    op.alter_column('orders', 'status', server_default=None)
+    op.execute("""
+        ALTER TABLE orders
+        ALTER COLUMN status TYPE varchar
+        USING (CASE status
+                   WHEN 1 THEN 'Оформлен'
+                   WHEN 2 THEN 'На сборке'
+                   WHEN 3 THEN 'Отправлен'
+                   WHEN 4 THEN 'Доставлен'
+                   WHEN 5 THEN 'Завершен'
+                   WHEN 6 THEN 'Отменен'
+               END)
+    """)
+    op.alter_column('orders', 'status', server_default='Оформлен')
@@ -0,0 +1,28 @@
+"""Messages chat_id, created_at, id index
+
+Revision ID: d71f5c2b8e06
+Revises: 4c8e0a7d9f13
+Create Date: 2026-10-19 18:24:53.218740
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd71f5c2b8e06'
+down_revision: Union[str, None] = '4c8e0a7d9f13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_messages_chat_id_created_at_id', 'messages', ['chat_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_messages_chat_id_created_at_id', table_name='messages')
@@ -0,0 +1,33 @@
+"""Users search indexes
+
+Revision ID: e2f7a9c41d58
+Revises: c5b8e21d7f46
+Create Date: 2026-10-19 16:12:08.431905
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2f7a9c41d58'
+down_revision: Union[str, None] = 'c5b8e21d7f46'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # префиксный поиск пользователей в фильтрах панели поддержки
+    op.create_index('ix_users_username_lower', 'users', [sa.text('lower(username) text_pattern_ops')], unique=False)
+    op.create_index('ix_users_first_name_lower', 'users', [sa.text('lower(first_name) text_pattern_ops')], unique=False)
+    op.create_index('ix_users_last_name_lower', 'users', [sa.text('lower(last_name) text_pattern_ops')], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_last_name_lower', table_name='users')
+    op.drop_index('ix_users_first_name_lower', table_name='users')
+    op.drop_index('ix_users_username_lower', table_name='users')
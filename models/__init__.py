@@ -5,8 +5,15 @@ from .users import User
 from .favorites import Favorites
 from .cart import Cart
 from .orders import Orders
+from .order_items import OrderItems
+from .idempotency_keys import IdempotencyKeys
 from .chats import Chats
 from .messages import Messages
+from .sales_rollups import SalesDaily, SalesDailyCategory, SalesDailyProduct, SalesRollupState
+from .support_agents import SupportAgents
+from .chats_archive import ChatsArchive, MessagesArchive
 
-__all__ = ["Product", "Category", "Review", "User", "Favorites", "Cart", "Orders", "Chats", "Messages"]
+__all__ = ["Product", "Category", "Review", "User", "Favorites", "Cart", "Orders", "OrderItems", "IdempotencyKeys", "Chats", "Messages",
+           "SalesDaily", "SalesDailyCategory", "SalesDailyProduct", "SalesRollupState", "SupportAgents",
+           "ChatsArchive", "MessagesArchive"]
 
@@ -1,11 +1,17 @@
 from database.db import Base
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, func
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Index, func, text
 from sqlalchemy.orm import relationship
 
 
 class Chats(Base):
     __tablename__ = 'chats'
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index('ix_chats_user_unread', 'user_id', postgresql_where=text('user_unread > 0')),
+        Index('ix_chats_employee_unread', 'employee_id', postgresql_where=text('employee_unread > 0')),
+        Index('ix_chats_closed_at', 'closed_at', postgresql_where=text('NOT active')),
+        Index('ix_chats_topic_fts', text("to_tsvector('russian', coalesce(topic, ''))"), postgresql_using='gin'),
+        {'extend_existing': True}
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -13,8 +19,19 @@ class Chats(Base):
     topic = Column(String)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     active = Column(Boolean, nullable=False, default=True)
+    closed_at = Column(DateTime(timezone=True))
+    # последнее сообщение денормализовано в чат и обновляется в create_message
+    last_message_id = Column(Integer, ForeignKey("messages.id", use_alter=True, name="fk_chats_last_message_id",
+                                                 ondelete="SET NULL"))
+    last_message_at = Column(DateTime(timezone=True))
+    # отметки прочтения участников, счетчики обновляются в create_message и mark_chat_read
+    user_last_read_id = Column(Integer)
+    user_unread = Column(Integer, nullable=False, default=0, server_default=text('0'))
+    employee_last_read_id = Column(Integer)
+    employee_unread = Column(Integer, nullable=False, default=0, server_default=text('0'))
 
-    messages = relationship("Messages", back_populates="chat")
+    messages = relationship("Messages", back_populates="chat", foreign_keys="[Messages.chat_id]")
+    last_message = relationship("Messages", foreign_keys=[last_message_id], viewonly=True)
 
     user = relationship(
         "User",
@@ -0,0 +1,50 @@
+from database.db import Base
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Index, func, text
+from sqlalchemy.orm import relationship
+
+
+class ChatsArchive(Base):
+    __tablename__ = 'chats_archive'
+    __table_args__ = (
+        Index('ix_chats_archive_user_id', 'user_id', 'created_at'),
+        Index('ix_chats_archive_employee_id', 'employee_id', 'created_at'),
+        Index('ix_chats_archive_topic_fts', text("to_tsvector('russian', coalesce(topic, ''))"),
+              postgresql_using='gin'),
+    )
+
+    # копия строки chats, перенесенная архиватором; колонки совпадают с chats для INSERT ... SELECT
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, nullable=False)
+    employee_id = Column(Integer, nullable=False)
+    topic = Column(String)
+    created_at = Column(DateTime(timezone=True))
+    active = Column(Boolean, nullable=False, default=False)
+    closed_at = Column(DateTime(timezone=True))
+    last_message_id = Column(Integer)
+    last_message_at = Column(DateTime(timezone=True))
+    user_last_read_id = Column(Integer)
+    user_unread = Column(Integer, nullable=False, default=0, server_default=text('0'))
+    employee_last_read_id = Column(Integer)
+    employee_unread = Column(Integer, nullable=False, default=0, server_default=text('0'))
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    last_message = relationship(
+        "MessagesArchive",
+        primaryjoin="foreign(ChatsArchive.last_message_id) == MessagesArchive.id",
+        viewonly=True
+    )
+
+
+class MessagesArchive(Base):
+    __tablename__ = 'messages_archive'
+    __table_args__ = (
+        Index('ix_messages_archive_chat_id_created_at_id', 'chat_id', 'created_at', 'id'),
+        Index('ix_messages_archive_message_fts', text("to_tsvector('russian', coalesce(message, ''))"),
+              postgresql_using='gin'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    chat_id = Column(Integer, nullable=False)
+    message = Column(String)
+    sender_id = Column(Integer)
+    created_at = Column(DateTime(timezone=True))
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint, JSON
+from sqlalchemy.sql import func
+
+from database.db import Base
+
+
+class IdempotencyKeys(Base):
+    __tablename__ = "idempotency_keys"
+
+    id = Column(Integer, primary_key=True, index=True)
+    key = Column(String(255), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    endpoint = Column(String, nullable=False)
+    request_hash = Column(String(64), nullable=True)  # отпечаток запроса, повтор ключа с другим запросом отклоняется
+    status_code = Column(Integer, nullable=True)
+    response = Column(JSON, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'endpoint', 'key', name='_user_endpoint_key_uc'),
+    )
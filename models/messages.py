@@ -1,11 +1,17 @@
 from database.db import Base
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, func
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index, func, text
 from sqlalchemy.orm import relationship
 
 
 class Messages(Base):
     __tablename__ = 'messages'
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        # история чата листается курсором (created_at, id) от новых к старым
+        Index('ix_messages_chat_id_created_at_id', 'chat_id', 'created_at', 'id'),
+        # полнотекстовый поиск операторов, выражение совпадает с fts_document в crud/chats.py
+        Index('ix_messages_message_fts', text("to_tsvector('russian', coalesce(message, ''))"), postgresql_using='gin'),
+        {'extend_existing': True}
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     chat_id = Column(Integer, ForeignKey("chats.id"), nullable=False)
@@ -13,4 +19,6 @@ class Messages(Base):
     sender_id = Column(Integer)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
-    chat = relationship("Chats", back_populates="messages")
+    chat = relationship("Chats", back_populates="messages", foreign_keys=[chat_id])
+
+    __mapper_args__ = {'eager_defaults': True}
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, UniqueConstraint, Index
+from sqlalchemy.orm import relationship
+
+from database.db import Base
+
+
+class OrderItems(Base):
+    __tablename__ = "order_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), nullable=False)
+    product_id = Column(Integer, nullable=False)  # без FK: история заказа переживает удаление товара
+    price = Column(Integer, nullable=False)
+    count = Column(Integer, nullable=False)
+    name = Column(String, nullable=True)  # снимок названия и картинки на момент оформления
+    image_url = Column(String, nullable=True)
+
+    order = relationship("Orders", back_populates="items")
+
+    __table_args__ = (
+        UniqueConstraint('order_id', 'product_id', name='_order_product_uc'),
+        Index('ix_order_items_product_id_order_id', 'product_id', 'order_id'),
+    )
@@ -1,17 +1,60 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, SmallInteger, DateTime, ForeignKey, Index, CheckConstraint, text
 from sqlalchemy.dialects.postgresql import JSON
+from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
+from sqlalchemy.types import TypeDecorator
 
 from config import Statuses
 from database.db import Base
 
 
+class OrderStatus(TypeDecorator):
+    # в БД хранится smallint-код, в коде и шаблонах - текст статуса из Statuses
+    impl = SmallInteger
+    cache_ok = True
+
+    labels = {code: label for label, code in Statuses.codes.items()}
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, int):
+            return value
+        try:
+            return Statuses.codes[value]
+        except KeyError:
+            raise ValueError(f'Неизвестный статус заказа: {value}')
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return value
+        return self.labels.get(value, value)
+
+
 class Orders(Base):
     __tablename__ = "orders"
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    products = Column(JSON, nullable=False)  # dict{product_id: {‘price’: price, ‘count’: count}}
+    products = Column(JSON, nullable=False)  # dict{product_id: {‘price’: price, ‘count’: count, ‘name’: name, ‘image_url’: image_url}}
     summa = Column(Integer, nullable=False)
     date = Column(DateTime(timezone=True), server_default=func.now())
-    status = Column(String, nullable=False, server_default=Statuses.DESIGNED)
+    status = Column(OrderStatus, nullable=False, server_default=text(str(Statuses.codes[Statuses.DESIGNED])))
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
+
+    items = relationship("OrderItems", back_populates="order", cascade="all, delete-orphan")
+
+    # date и status возвращаются из INSERT ... RETURNING, без отдельного SELECT
+    __mapper_args__ = {'eager_defaults': True}
+
+    __table_args__ = (
+        CheckConstraint(f'status BETWEEN {min(Statuses.codes.values())} AND {max(Statuses.codes.values())}',
+                        name='ck_orders_status'),
+        # индексы под фильтры и сортировки панели поддержки (keyset по (колонка, id))
+        Index('ix_orders_date_id', 'date', 'id'),
+        Index('ix_orders_user_id_date_id', 'user_id', 'date', 'id'),
+        Index('ix_orders_status_date_id', 'status', 'date', 'id'),
+        Index('ix_orders_summa_id', 'summa', 'id'),
+        Index('ix_orders_designed_date_id', 'date', 'id',
+              postgresql_where=text(f'status = {Statuses.codes[Statuses.DESIGNED]}')),
+        # по нему задача витрин продаж находит измененные заказы
+        Index('ix_orders_updated_at', 'updated_at'),
+    )
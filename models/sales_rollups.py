@@ -0,0 +1,43 @@
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime
+
+from database.db import Base
+from .orders import OrderStatus
+
+
+class SalesDaily(Base):
+    __tablename__ = "sales_daily"
+
+    day = Column(Date, primary_key=True)
+    status = Column(OrderStatus, primary_key=True)
+    revenue = Column(BigInteger, nullable=False, default=0)
+    orders_count = Column(Integer, nullable=False, default=0)
+    units = Column(Integer, nullable=False, default=0)
+
+
+class SalesDailyCategory(Base):
+    __tablename__ = "sales_daily_category"
+
+    day = Column(Date, primary_key=True)
+    status = Column(OrderStatus, primary_key=True)
+    category_id = Column(Integer, primary_key=True)  # 0 - товар без категории или удален
+    revenue = Column(BigInteger, nullable=False, default=0)
+    orders_count = Column(Integer, nullable=False, default=0)
+    units = Column(Integer, nullable=False, default=0)
+
+
+class SalesDailyProduct(Base):
+    __tablename__ = "sales_daily_product"
+
+    day = Column(Date, primary_key=True)
+    status = Column(OrderStatus, primary_key=True)
+    product_id = Column(Integer, primary_key=True)
+    revenue = Column(BigInteger, nullable=False, default=0)
+    orders_count = Column(Integer, nullable=False, default=0)
+    units = Column(Integer, nullable=False, default=0)
+
+
+class SalesRollupState(Base):
+    __tablename__ = "sales_rollup_state"
+
+    name = Column(String, primary_key=True)
+    last_run_at = Column(DateTime(timezone=True), nullable=False)
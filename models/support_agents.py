@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, Boolean, ForeignKey, Index, text
+
+from database.db import Base
+
+
+class SupportAgents(Base):
+    __tablename__ = "support_agents"
+
+    # ростер операторов, между которыми распределяются новые чаты
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    active_chats = Column(Integer, nullable=False, default=0, server_default=text('0'))
+    available = Column(Boolean, nullable=False, default=True, server_default=text('true'))
+
+    __table_args__ = (
+        Index('ix_support_agents_load', 'active_chats', 'user_id', postgresql_where=text('available')),
+    )
@@ -1,5 +1,5 @@
 from database.db import Base
-from sqlalchemy import Column, Integer, String, Boolean
+from sqlalchemy import Column, Integer, String, Boolean, Index, text
 from sqlalchemy.orm import relationship
 
 
@@ -15,6 +15,12 @@ class User(Base):
     is_admin = Column(Boolean, default=False)
     role = Column(String, default='customer')
 
+    __table_args__ = (
+        Index('ix_users_username_lower', text('lower(username) text_pattern_ops')),
+        Index('ix_users_first_name_lower', text('lower(first_name) text_pattern_ops')),
+        Index('ix_users_last_name_lower', text('lower(last_name) text_pattern_ops')),
+    )
+
     products = relationship("Product", back_populates="supplier")
     reviews = relationship("Review", back_populates="user")
     cart = relationship('Cart', uselist=False, back_populates='user')
@@ -135,6 +135,11 @@ class ChangeOrderStatus(BaseModel):
     new_status: str
 
 
+class ChangeOrdersStatus(BaseModel):
+    order_ids: List[int] = Field(..., min_length=1, max_length=500)
+    new_status: str
+
+
 class RegisterData(BaseModel):
     first_name: str
     last_name: str
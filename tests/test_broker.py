@@ -0,0 +1,85 @@
+import asyncio
+import json
+
+import asyncpg
+import pytest
+
+from general_functions.broker import EventBroker, SubscriptionOverflow
+
+TEST_CHANNEL = "test_events"
+
+
+async def _notify(conn, **event):
+    await conn.execute("SELECT pg_notify($1, $2)", TEST_CHANNEL, json.dumps(event))
+
+
+async def _start_broker(dsn, **kwargs):
+    broker = EventBroker(dsn=dsn, **kwargs)
+    broker.register(TEST_CHANNEL, key_field="chat_id")
+    await broker.start()
+    return broker
+
+
+def test_broker_delivers_only_committed_events_to_matching_key(listen_dsn):
+    async def scenario():
+        broker = await _start_broker(listen_dsn)
+        conn = await asyncpg.connect(listen_dsn)
+        try:
+            async with broker.subscribe(TEST_CHANNEL, key=1) as subscription:
+                transaction = conn.transaction()
+                await transaction.start()
+                await _notify(conn, event="message_created", chat_id=1, n=0)
+                await transaction.rollback()
+
+                await _notify(conn, event="message_created", chat_id=2, n=1)
+                await _notify(conn, event="message_created", chat_id=1, n=2)
+
+                event = await asyncio.wait_for(subscription.get(), timeout=5)
+                assert event["n"] == 2
+                with pytest.raises(asyncio.TimeoutError):
+                    await asyncio.wait_for(subscription.get(), timeout=0.5)
+        finally:
+            await conn.close()
+            await broker.stop()
+
+    asyncio.run(scenario())
+
+
+def test_broker_disconnects_slow_subscriber(listen_dsn):
+    async def scenario():
+        broker = await _start_broker(listen_dsn, queue_size=2)
+        conn = await asyncpg.connect(listen_dsn)
+        try:
+            async with broker.subscribe(TEST_CHANNEL) as slow, broker.subscribe(TEST_CHANNEL) as fast:
+                for n in range(3):
+                    await _notify(conn, event="message_created", chat_id=1, n=n)
+                    assert (await asyncio.wait_for(fast.get(), timeout=5))["n"] == n
+
+                with pytest.raises(SubscriptionOverflow):
+                    await asyncio.wait_for(slow.get(), timeout=5)
+        finally:
+            await conn.close()
+            await broker.stop()
+
+    asyncio.run(scenario())
+
+
+def test_broker_reconnects_after_listen_connection_is_killed(listen_dsn):
+    async def scenario():
+        broker = await _start_broker(listen_dsn, reconnect_delay=0.1, healthcheck_interval=1)
+        conn = await asyncpg.connect(listen_dsn)
+        try:
+            async with broker.subscribe(TEST_CHANNEL) as subscription:
+                await conn.execute(
+                    "SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+                    f"WHERE query LIKE 'LISTEN \"{TEST_CHANNEL}\"%' AND pid <> pg_backend_pid()"
+                )
+                assert (await asyncio.wait_for(subscription.get(), timeout=10))["event"] == "resync"
+
+                await _notify(conn, event="message_created", chat_id=1, n=1)
+                assert (await asyncio.wait_for(subscription.get(), timeout=5))["n"] == 1
+        finally:
+            await conn.close()
+            await broker.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,27 @@
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+import models
+from general_functions import chat_func
+
+
+def test_chat_socket_closes_when_event_push_fails(client, db_session, create_user, monkeypatch):
+    agent = models.User(username='agent', email='agent@example.com', hashed_password='-', role='support')
+    db_session.add(agent)
+    db_session.flush()
+    chat = models.Chats(user_id=create_user['id'], employee_id=agent.id, topic='Доставка')
+    db_session.add(chat)
+    db_session.commit()
+
+    async def broken_push(websocket, subscription, names):
+        raise ValueError('boom')
+
+    monkeypatch.setattr(chat_func, '_push_chat_events', broken_push)
+    client.cookies.set('token', create_user['token'])
+
+    # без рассылки сокет бесполезен - сервер должен закрыть его, а не молча ждать входящих сообщений
+    with client.websocket_connect(f'/messages/ws/{chat.id}') as websocket:
+        with pytest.raises(WebSocketDisconnect) as exc_info:
+            websocket.receive_json()
+
+    assert exc_info.value.code == 1011
@@ -0,0 +1,105 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+
+import asyncpg
+
+import models
+from database.db import async_session_maker, engine as async_engine
+from general_functions.agents_func import AgentRoster
+from general_functions.auth_func import create_access_token
+from general_functions.broker import ROSTER_EVENTS_CHANNEL
+
+
+def _add_agent(db_session, username, active_chats=0, available=True):
+    agent = models.User(username=username, email=f'{username}@example.com', hashed_password='-', role='seller')
+    db_session.add(agent)
+    db_session.flush()
+    db_session.add(models.SupportAgents(user_id=agent.id, active_chats=active_chats, available=available))
+    db_session.commit()
+    return agent.id
+
+
+def test_chat_create_assigns_least_loaded_agent(client, db_session, create_user):
+    _add_agent(db_session, 'busy', active_chats=3)
+    free_id = _add_agent(db_session, 'free', active_chats=1)
+    client.cookies.set('token', create_user['token'])
+
+    response = client.post('/chats/create', json={'topic': 'Доставка'})
+
+    assert response.status_code == 201
+    chat = db_session.query(models.Chats).one()
+    assert chat.employee_id == free_id
+    assert db_session.get(models.SupportAgents, free_id).active_chats == 2
+
+
+def test_chat_create_notifies_roster_about_new_load(client, db_session, create_user, listen_dsn):
+    agent_id = _add_agent(db_session, 'agent', active_chats=1)
+    client.cookies.set('token', create_user['token'])
+
+    async def scenario():
+        events = asyncio.Queue()
+        conn = await asyncpg.connect(listen_dsn)
+        try:
+            await conn.add_listener(ROSTER_EVENTS_CHANNEL, lambda *args: events.put_nowait(json.loads(args[-1])))
+            assert client.post('/chats/create', json={'topic': 'Доставка'}).status_code == 201
+            return await asyncio.wait_for(events.get(), timeout=5)
+        finally:
+            await conn.close()
+
+    assert asyncio.run(scenario()) == {'event': 'agent_load', 'user_id': agent_id, 'active_chats': 2}
+
+
+def test_agent_roster_follows_load_events_and_reloads_on_removal(db_session):
+    busy_id = _add_agent(db_session, 'busy', active_chats=2)
+    free_id = _add_agent(db_session, 'free', active_chats=0)
+    roster = AgentRoster(ttl=60)
+
+    async def scenario():
+        try:
+            async with async_session_maker() as db:
+                assert await roster.candidates(db=db) == [free_id, busy_id]
+
+                # счетчик обновляется из события, без повторного чтения таблицы
+                roster.apply({'event': 'agent_load', 'user_id': free_id, 'active_chats': 5})
+                assert await roster.candidates(db=db) == [busy_id, free_id]
+
+                db_session.query(models.SupportAgents).filter_by(user_id=busy_id).delete()
+                db_session.commit()
+                roster.apply({'event': 'agent_removed', 'user_id': busy_id})
+                assert await roster.candidates(db=db) == [free_id]
+        finally:
+            await async_engine.dispose()
+
+    asyncio.run(scenario())
+
+
+def test_customer_sees_archived_chats(client, db_session, create_user):
+    agent_id = _add_agent(db_session, 'agent')
+    db_session.add(models.ChatsArchive(id=7, user_id=create_user['id'], employee_id=agent_id, topic='Возврат',
+                                        created_at=datetime.now(timezone.utc)))
+    db_session.commit()
+    client.cookies.set('token', create_user['token'])
+
+    # архиватор переносит закрытые чаты из chats - покупатель должен находить их в архивном списке
+    assert [chat['id'] for chat in client.get('/chats/my', params={'archived': 1}).json()] == [7]
+    assert 'Чат #7' in client.get('/chats/load-more', params={'archived': 1}).text
+    assert 'Чат #7' in client.get('/auth/account', params={'section': 'chats_tab', 'archived': 1}).text
+    assert 'Чат #7' not in client.get('/auth/account', params={'section': 'chats_tab'}).text
+
+
+def test_customer_cannot_view_foreign_archived_chat(client, db_session, create_user):
+    agent_id = _add_agent(db_session, 'agent')
+    db_session.add(models.ChatsArchive(id=7, user_id=create_user['id'], employee_id=agent_id, topic='Возврат',
+                                       created_at=datetime.now(timezone.utc)))
+    db_session.add(models.MessagesArchive(id=1, chat_id=7, sender_id=create_user['id'], message='Мой адрес'))
+    stranger = models.User(username='stranger', email='stranger@example.com', hashed_password='-', role='customer')
+    db_session.add(stranger)
+    db_session.commit()
+    client.cookies.set('token', create_access_token(username=stranger.username, user_id=stranger.id,
+                                                    role=stranger.role))
+
+    response = client.get('/chats/7/view')
+
+    assert response.status_code == 403
+    assert 'Мой адрес' not in response.text
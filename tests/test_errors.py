@@ -0,0 +1,51 @@
+import pytest
+
+import models
+from general_functions.auth_func import create_access_token
+
+
+@pytest.fixture
+def foreign_chat(db_session):
+    # чат другого покупателя с другим оператором
+    owner = models.User(username='owner', email='owner@example.com', hashed_password='-', role='customer')
+    agent = models.User(username='agent', email='agent@example.com', hashed_password='-', role='support')
+    db_session.add_all([owner, agent])
+    db_session.flush()
+    chat = models.Chats(user_id=owner.id, employee_id=agent.id, topic='Доставка')
+    db_session.add(chat)
+    db_session.commit()
+    return chat.id
+
+
+# до изменения handler_base_errors все эти ответы превращались в 500
+@pytest.mark.parametrize("method, url, body, expected_status", [
+    ("get", "/chats/999", None, 404),
+    ("patch", "/chats/close?chat_id=999", None, 404),
+    ("post", "/chats/{chat_id}/read", None, 403),
+    ("get", "/messages/by_chat/{chat_id}", None, 403),
+    ("post", "/messages/create", {"chat_id": 999, "message": "Привет"}, 404),
+    ("post", "/chats/create", {"topic": "Доставка"}, 503),
+])
+def test_customer_endpoints_keep_http_error_status(client, create_user, foreign_chat,
+                                                   method, url, body, expected_status):
+    client.cookies.set('token', create_user['token'])
+
+    response = client.request(method, url.format(chat_id=foreign_chat), json=body)
+
+    assert response.status_code == expected_status
+
+
+@pytest.mark.parametrize("url, expected_status", [
+    ("/support/chats/999/read", 404),
+    ("/support/chats/{chat_id}/read", 403),
+])
+def test_support_endpoints_keep_http_error_status(support_client, db_session, foreign_chat, url, expected_status):
+    other_agent = models.User(username='other', email='other@example.com', hashed_password='-', role='support')
+    db_session.add(other_agent)
+    db_session.commit()
+    support_client.cookies.set('token', create_access_token(username=other_agent.username,
+                                                            user_id=other_agent.id, role=other_agent.role))
+
+    response = support_client.post(url.format(chat_id=foreign_chat))
+
+    assert response.status_code == expected_status
@@ -0,0 +1,24 @@
+import csv
+import io
+
+import models
+from general_functions.auth_func import create_access_token
+
+
+def test_orders_export_escapes_formula_cells(support_client, db_session):
+    # имя задает сам пользователь, в выгрузке для Excel оно не должно стать формулой
+    customer = models.User(username='formula', email='formula@example.com', first_name='=HYPERLINK("http://x")',
+                           last_name='', hashed_password='-', role='customer')
+    agent = models.User(username='agent', email='agent@example.com', hashed_password='-', role='support')
+    db_session.add_all([customer, agent])
+    db_session.flush()
+    db_session.add(models.Orders(user_id=customer.id, products={}, summa=100))
+    db_session.commit()
+
+    support_client.cookies.set('token', create_access_token(username=agent.username, user_id=agent.id,
+                                                            role=agent.role))
+    response = support_client.get('/support/orders/export')
+
+    assert response.status_code == 200
+    rows = list(csv.reader(io.StringIO(response.text.lstrip('﻿')), delimiter=';'))
+    assert rows[1][3] == '\'=HYPERLINK("http://x")'
@@ -0,0 +1,72 @@
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import select, text
+
+import models
+from app_support.functions.main_func import apply_orders_filters, get_sort_column
+from config import Config, Statuses
+from database.crud.chats import build_chat_search_query
+from general_functions.pagination_func import apply_keyset, encode_cursor
+from models import Orders
+
+
+def _plan_index_names(plan):
+    names = set()
+    if plan.get("Node Type", "").endswith("Index Scan") or plan.get("Node Type") == "Index Only Scan":
+        names.add(plan.get("Index Name"))
+    for child in plan.get("Plans", []):
+        names |= _plan_index_names(child)
+    return names
+
+
+@pytest.mark.parametrize("filters, sort_by, sort_order, cursor, expected_indexes", [
+    ({}, "date", "desc", None, {"ix_orders_date_id"}),
+    ({"date_start": "2025-01-01", "date_end": "2025-12-31"}, "date", "desc", None, {"ix_orders_date_id"}),
+    ({"user_id": [1]}, "date", "desc", None, {"ix_orders_user_id_date_id"}),
+    ({"status": [Statuses.SENT]}, "date", "desc", None, {"ix_orders_status_date_id"}),
+    ({"status": [Statuses.DESIGNED]}, "date", "desc", None, {"ix_orders_designed_date_id", "ix_orders_status_date_id"}),
+    ({"sum_from": 1000, "sum_to": 50000}, "summa", "asc", None, {"ix_orders_summa_id"}),
+    ({}, "date", "desc", encode_cursor(datetime(2025, 6, 1, tzinfo=timezone.utc), 100), {"ix_orders_date_id"}),
+])
+def test_dashboard_queries_use_indexes(sync_engine, filters, sort_by, sort_order, cursor, expected_indexes):
+    # запрос собирается теми же функциями, что и в get_main_page; на маленькой тестовой таблице
+    # планировщик выбрал бы seq scan, поэтому он отключается
+    stmt, _, _ = apply_orders_filters(select(Orders), **filters)
+    stmt = apply_keyset(stmt, get_sort_column(sort_by), Orders.id, cursor=cursor, sort_desc=(sort_order == "desc"))
+    stmt = stmt.limit(Config.PAGE_SIZE + 1)
+
+    with sync_engine.connect() as conn:
+        compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+        conn.execute(text("SET enable_seqscan = off"))
+        plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}").scalar()
+
+    assert expected_indexes & _plan_index_names(plan[0]["Plan"])
+
+
+def test_chat_search_uses_fts_indexes(sync_engine):
+    # EXPLAIN строится по настоящему запросу search_chats: выражение fts_document должно совпасть с ix_*_fts
+    statement = build_chat_search_query(query='доставка заказа')
+    with sync_engine.connect() as conn:
+        compiled = statement.compile(dialect=conn.dialect)
+        conn.execute(text("SET enable_seqscan = off"))
+        plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled.string}", compiled.params).scalar()
+
+    assert {"ix_messages_message_fts", "ix_chats_topic_fts",
+            "ix_messages_archive_message_fts", "ix_chats_archive_topic_fts"} <= _plan_index_names(plan[0]["Plan"])
+
+
+def test_chat_search_hit_ids_do_not_overflow_integer(db_session):
+    # удвоенный id около 2^31 не помещается в integer
+    big_id = 1_500_000_000
+    user = models.User(username='searcher', email='searcher@example.com', hashed_password='-', role='customer')
+    db_session.add(user)
+    db_session.flush()
+    db_session.add(models.Chats(id=big_id, user_id=user.id, employee_id=user.id, topic='Доставка заказа'))
+    db_session.flush()
+    db_session.add(models.Messages(id=big_id, chat_id=big_id, sender_id=user.id, message='Где доставка?'))
+    db_session.commit()
+
+    rows = db_session.execute(build_chat_search_query(query='доставка')).all()
+
+    assert sorted(row.hit_id for row in rows) == [big_id * 2, big_id * 2 + 1]
@@ -0,0 +1,69 @@
+import httpx
+
+import models
+
+
+def test_create_order_makes_no_outbound_http_calls(client, create_user, create_product, monkeypatch):
+    # оформление заказа не должно ходить по HTTP в собственный сервис (например, в /cart/clear)
+    outbound_urls = []
+
+    async def _fail_on_send(self, request, *args, **kwargs):
+        outbound_urls.append(str(request.url))
+        raise AssertionError(f"Неожиданный HTTP-запрос: {request.url}")
+
+    monkeypatch.setattr(httpx.AsyncClient, "send", _fail_on_send)
+    client.cookies.set("token", create_user["token"])
+
+    added = client.post("/cart/add", json={"product_id": create_product["id"]})
+    assert added.status_code == 201
+
+    response = client.post("/orders/create")
+
+    assert response.status_code == 201
+    assert outbound_urls == []
+
+    cart = client.get(f"/cart/{create_user['id']}")
+    assert cart.status_code == 200
+    assert cart.json() == []
+
+
+def test_create_order_replays_response_for_same_idempotency_key(client, create_user, create_product):
+    client.cookies.set("token", create_user["token"])
+    client.post("/cart/add", json={"product_id": create_product["id"]})
+
+    first = client.post("/orders/create", headers={"Idempotency-Key": "order-1"})
+    second = client.post("/orders/create", headers={"Idempotency-Key": "order-1"})
+
+    assert first.status_code == 201
+    assert second.status_code == 201
+    assert second.json() == first.json()
+
+
+def test_create_order_reports_conflict_while_key_is_in_progress(client, create_user, create_product, monkeypatch):
+    # ключ занят параллельным запросом, который еще не сохранил ответ
+    async def _claimed_elsewhere(**kwargs):
+        return None
+
+    monkeypatch.setattr("app.routers.orders.place_order", _claimed_elsewhere)
+    client.cookies.set("token", create_user["token"])
+    client.post("/cart/add", json={"product_id": create_product["id"]})
+
+    response = client.post("/orders/create", headers={"Idempotency-Key": "order-2"})
+
+    assert response.status_code == 409
+
+
+def test_create_order_rejects_key_reused_for_different_cart(client, db_session, create_user, create_product):
+    client.cookies.set("token", create_user["token"])
+    client.post("/cart/add", json={"product_id": create_product["id"]})
+    first = client.post("/orders/create", headers={"Idempotency-Key": "order-1"})
+
+    other = models.Product(name="Мышь", description="...", price=1500, stock=5)
+    db_session.add(other)
+    db_session.commit()
+    client.post("/cart/add", json={"product_id": other.id})
+    second = client.post("/orders/create", headers={"Idempotency-Key": "order-1"})
+
+    assert first.status_code == 201
+    assert second.status_code == 422
+    assert db_session.query(models.Orders).count() == 1